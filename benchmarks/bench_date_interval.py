@@ -0,0 +1,42 @@
+'''
+Measures how long it takes to evaluate the valid days of a year for date
+ranges with and without an interval.
+
+    python benchmarks/bench_date_interval.py [repeat]
+
+Each schedule has its year bitmap rebuilt from the date rules, which is the
+work done whenever next() or previous() reaches a year that isn't cached.
+'''
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from schyntax.internals.compiler import compile_schedule
+
+
+FORMATS = [
+    "dates(1/1..12/31)",
+    "dates(1/1..12/31 % 3)",
+    "dates(11/1..2/28)",
+    "dates(11/1..2/28 % 2)",
+    "dates(2/29..12/31 % 7)",
+    "dates(2015/1/1..2017/12/31 % 10)",
+]
+
+
+def main(repeat):
+    print("%-36s %12s" % ("schedule", "us per year"))
+    for fmt in FORMATS:
+        group = compile_schedule(fmt)[0][0]
+
+        started = time.time()
+        for i in range(repeat):
+            group._compile_year(2015 + i % 4)
+        elapsed = time.time() - started
+
+        print("%-36s %12.1f" % (fmt, elapsed / repeat * 1e6))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,82 @@
+'''
+Measures the memory held by parse trees when loading many schedules.
+
+    python benchmarks/bench_memory.py [count]
+
+Every schedule is parsed on its own (bypassing the parse cache), as if each
+one came from a different source, and all of them are kept alive while
+their size is measured.
+'''
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from schyntax.internals.parser import parse
+
+
+FORMATS = [
+    "minutes(*%5)",
+    "hours(*%2), minutes(0)",
+    "days(mon..fri), hours(9), minutes(30)",
+    "dom(-1), hours(23), minutes(59)",
+    "{days(sat, sun), hours(10)} {days(mon..fri), hours(8, 12, 17)}",
+    "dates(12/24..1/2), hours(!0..6), minutes(*%15)",
+    "seconds(0, 15, 30, 45), minutes(!0..5)",
+]
+
+_shared_types = (int, bool, str, type(None))
+
+
+def _deep_size(obj, seen):
+    '''
+    Returns the size of obj and everything it references, counting each
+    object once. Small shared values such as ints are not counted.
+    '''
+    if id(obj) in seen or isinstance(obj, _shared_types):
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple)):
+        children = list(obj)
+    else:
+        children = []
+        if hasattr(obj, '__dict__'):
+            size += _deep_size(obj.__dict__, seen)
+            children.extend(obj.__dict__.values())
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot):
+                children.append(getattr(obj, slot))
+    if isinstance(obj, dict):
+        children.extend(obj.values())
+
+    return size + sum(_deep_size(child, seen) for child in children)
+
+
+def _count_ranges(group):
+    return sum(len(getattr(group, field)) for field in dir(group)
+               if field.startswith(('dates', 'days', 'hours', 'minutes', 'seconds')))
+
+
+def main(count):
+    started = time.time()
+
+    schedules = []
+    for i in range(count):
+        schedules.append(parse(FORMATS[i % len(FORMATS)]))
+
+    elapsed = time.time() - started
+
+    used = _deep_size(schedules, set()) - sys.getsizeof(schedules)
+    ranges = sum(_count_ranges(group) for groups in schedules for group in groups)
+
+    print("schedules:          %d" % count)
+    print("parse time:         %.2f s" % elapsed)
+    print("memory:             %.1f MB" % (used / 1e6))
+    print("bytes per schedule: %.0f" % (used / float(count)))
+    print("bytes per range:    %.0f" % (used / float(ranges)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
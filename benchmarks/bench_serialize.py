@@ -0,0 +1,53 @@
+'''
+Compares loading schedules from their text with loading them from the
+serialized form.
+
+    python benchmarks/bench_serialize.py [count]
+
+The parse cache is disabled, as if every schedule string were different.
+'''
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+import schyntax
+from schyntax.serialize import dumps, loads, dumps_many, loads_many
+
+
+FORMATS = [
+    "minutes(*%5)",
+    "hours(*%2), minutes(0)",
+    "days(mon..fri), hours(9), minutes(30)",
+    "dom(-1), hours(23), minutes(59)",
+    "{days(sat, sun), hours(10)} {days(mon..fri), hours(8, 12, 17)}",
+    "dates(12/24..1/2), hours(!0..6), minutes(*%15)",
+    "seconds(0, 15, 30, 45), minutes(!0..5)",
+]
+
+
+def _time(label, func, count):
+    started = time.time()
+    result = func()
+    elapsed = time.time() - started
+    print("%-28s %8.2f s %10.1f us each" % (label, elapsed, elapsed / count * 1e6))
+    return result
+
+
+def main(count):
+    schyntax.set_parse_cache_size(0)
+    texts = [FORMATS[i % len(FORMATS)] for i in range(count)]
+
+    schedules = _time("parse", lambda: [schyntax.Schedule(text) for text in texts], count)
+    blobs = [dumps(schedule) for schedule in schedules]
+    blob = dumps_many(schedules)
+
+    _time("loads", lambda: [loads(data) for data in blobs], count)
+    _time("loads_many", lambda: loads_many(blob), count)
+
+    print("bytes per schedule (dumps):      %.0f" % (sum(len(data) for data in blobs) / float(count)))
+    print("bytes per schedule (dumps_many): %.0f" % (len(blob) / float(count)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
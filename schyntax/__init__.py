@@ -1,2 +1,3 @@
-from .schedule import Schedule
+from .schedule import Schedule, set_parse_cache_size, get_parse_cache_info, clear_parse_cache
+from .scheduleset import ScheduleSet
 from .exceptions import *
@@ -0,0 +1,168 @@
+'''
+asyncio job runner which calls coroutine functions on the events of their
+schedules.
+
+This module needs Python 3.7+ and is not imported by the schyntax package
+itself, import it as schyntax.aio.
+'''
+import asyncio
+import collections
+import datetime
+
+from schyntax.scheduleset import ScheduleSet
+
+
+__all__ = ['AsyncScheduler', 'SKIP', 'QUEUE', 'CONCURRENT']
+
+
+# what to do when a job is due while its previous run hasn't finished
+SKIP = 'skip'               # drop the new run
+QUEUE = 'queue'             # start the new run once the previous ones are done
+CONCURRENT = 'concurrent'   # start the new run right away
+
+_OVERLAP_POLICIES = (SKIP, QUEUE, CONCURRENT)
+
+# Longest single sleep, in seconds. The timer runs on the loop's monotonic
+# clock while events are in wall-clock time, so waking up now and then
+# notices wall-clock adjustments.
+MAX_SLEEP = 60.0
+
+
+class _Job(object):
+    def __init__(self, func, overlap):
+        self.func = func
+        self.overlap = overlap
+        self.tasks = set()
+        self.queued = collections.deque()
+
+
+class AsyncScheduler(object):
+    '''
+    Runs any number of jobs from a single timer on the event loop. Each job
+    is a coroutine function called with the time of the event it runs for,
+    whenever its Schedule has an event.
+
+    All schedules live in one ScheduleSet, so each wake-up only looks at the
+    earliest upcoming event. The time until it is measured against the wall
+    clock on every wake-up and slept on the loop's monotonic clock, so the
+    sleeps don't accumulate drift.
+
+    Several events of the same job becoming due at once, for instance after
+    the loop was blocked, run the job only once, for the latest of them.
+    '''
+    def __init__(self, now=None):
+        '''
+        now is a function returning the current time as a naive UTC
+        datetime, by default datetime.datetime.utcnow.
+        '''
+        self._now = now or datetime.datetime.utcnow
+        self._schedules = ScheduleSet()
+        self._jobs = {}
+        self._wakeup = None
+        self._running = False
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, key):
+        return key in self._jobs
+
+    def add(self, key, schedule, func, overlap=SKIP):
+        '''
+        Adds a job under the given key, replacing any job already stored
+        with that key. func is called as func(time) for each event, and must
+        return an awaitable. overlap is SKIP, QUEUE or CONCURRENT.
+        '''
+        if overlap not in _OVERLAP_POLICIES:
+            raise ValueError("overlap must be one of %s" % ', '.join(_OVERLAP_POLICIES))
+
+        self._jobs[key] = _Job(func, overlap)
+        self._schedules.add(key, schedule, self._now())
+        self._wake()
+
+    def remove(self, key):
+        '''
+        Removes the job with the given key, if there is one. Runs which have
+        already started are left to finish, queued runs are dropped.
+        '''
+        self._jobs.pop(key, None)
+        self._schedules.remove(key)
+        self._wake()
+
+    def stop(self):
+        '''
+        Makes run() return. Runs which have already started are left to
+        finish.
+        '''
+        self._running = False
+        self._wake()
+
+    async def run(self):
+        '''
+        Runs the jobs until stop() is called.
+        '''
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._running = True
+
+        try:
+            while self._running:
+                now = self._now()
+
+                for time, key in self._schedules.pop_latest_due(now):
+                    self._start(key, time)
+
+                self._wakeup.clear()
+                timer = None
+
+                head = self._schedules.peek()
+                if head is not None:
+                    delay = min(max((head[0] - self._now()).total_seconds(), 0), MAX_SLEEP)
+                    timer = loop.call_later(delay, self._wakeup.set)
+
+                await self._wakeup.wait()
+                if timer is not None:
+                    timer.cancel()
+        finally:
+            self._running = False
+            self._wakeup = None
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _start(self, key, time):
+        job = self._jobs[key]
+        if job.tasks:
+            if job.overlap == SKIP:
+                return
+            if job.overlap == QUEUE:
+                job.queued.append(time)
+                return
+
+        try:
+            task = asyncio.ensure_future(job.func(time))
+        except Exception as e:
+            # a job which fails before returning an awaitable must not stop the others
+            asyncio.get_running_loop().call_exception_handler({
+                'message': "Scheduled job %r raised an exception" % (key,),
+                'exception': e,
+            })
+            return
+
+        job.tasks.add(task)
+        task.add_done_callback(lambda task: self._finished(key, job, task))
+
+    def _finished(self, key, job, task):
+        job.tasks.discard(task)
+
+        if not task.cancelled() and task.exception() is not None:
+            task.get_loop().call_exception_handler({
+                'message': "Scheduled job %r raised an exception" % (key,),
+                'exception': task.exception(),
+                'task': task,
+            })
+
+        # only jobs which are still registered run their queued events
+        if job.queued and self._jobs.get(key) is job:
+            self._start(key, job.queued.popleft())
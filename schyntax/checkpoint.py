@@ -0,0 +1,211 @@
+import bisect
+import datetime
+import os
+import struct
+import zlib
+
+from schyntax.internals.compiler import normalize_schedule_text
+from schyntax.internals.dateutil import get_epoch_seconds, get_datetime_from_epoch_seconds
+
+
+__all__ = ['Checkpoint', 'catch_up']
+
+
+# file header: magic and format version
+_MAGIC = b'SCHK'
+_VERSION = 1
+_HEADER = struct.Struct('<4sB')
+
+# each batch is its payload length and CRC-32, followed by the payload
+_BATCH = struct.Struct('<II')
+
+# each record is the fire time in epoch seconds and the length of the
+# UTF-8 encoded key, followed by the key
+_RECORD = struct.Struct('<qH')
+
+# longest key the length field of a record can hold, in UTF-8 bytes
+MAX_KEY_LENGTH = 0xffff
+
+
+class Checkpoint(object):
+    '''
+    Append-only file of the last fire time of each key, for finding the
+    events missed while a process was down.
+
+    Records are buffered and appended in batches, each with a length and a
+    checksum, and the file is fsync'ed after every batch. A batch torn by a
+    crash fails its checksum and is discarded, along with anything after it,
+    the next time the file is opened. Later records for a key supersede
+    earlier ones, compact() rewrites the file with one record per key.
+    '''
+    def __init__(self, path, batch_size=1000):
+        '''
+        Opens the checkpoint at path, creating it if needed. record() flushes
+        by itself once batch_size records are buffered.
+        '''
+        self.path = path
+        self.batch_size = batch_size
+        self._last = {}
+        self._pending = []
+
+        end = self._load()
+        self._file = open(path, 'r+b' if end else 'wb')
+        if end:
+            # drop a torn batch, so new batches don't follow garbage
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION))
+            self._sync()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._last)
+
+    def last_fired(self):
+        '''
+        Returns a dict of the last recorded fire time of each key, including
+        records which haven't been flushed yet.
+        '''
+        return dict((key, get_datetime_from_epoch_seconds(ts)) for key, ts in self._last.items())
+
+    def record(self, key, time):
+        '''
+        Records that the job with the given (string) key fired at the given
+        time. Any fraction of a second is dropped. Raises ValueError if the
+        UTF-8 encoded key is longer than MAX_KEY_LENGTH bytes.
+        '''
+        if len(key.encode('utf-8')) > MAX_KEY_LENGTH:
+            raise ValueError("checkpoint keys are limited to %d bytes of UTF-8" % MAX_KEY_LENGTH)
+
+        ts = get_epoch_seconds(time)
+        self._last[key] = ts
+        self._pending.append((key, ts))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        '''
+        Appends the buffered records to the file as one batch.
+        '''
+        if not self._pending:
+            return
+
+        payload = b''.join(self._pack(key, ts) for key, ts in self._pending)
+        self._file.write(_BATCH.pack(len(payload), zlib.crc32(payload) & 0xffffffff) + payload)
+        self._sync()
+        del self._pending[:]
+
+    def compact(self):
+        '''
+        Rewrites the file with a single record per key. The new file replaces
+        the old one atomically, so a crash leaves one or the other.
+        '''
+        del self._pending[:]
+        self._file.close()
+
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            payload = b''.join(self._pack(key, ts) for key, ts in self._last.items())
+            f.write(_HEADER.pack(_MAGIC, _VERSION))
+            if payload:
+                f.write(_BATCH.pack(len(payload), zlib.crc32(payload) & 0xffffffff) + payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+        self._file = open(self.path, 'ab')
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _pack(self, key, ts):
+        encoded = key.encode('utf-8')
+        return _RECORD.pack(ts, len(encoded)) + encoded
+
+    def _load(self):
+        '''
+        Reads the records of an existing file. Returns the offset just past
+        the last intact batch, or 0 if there is no file yet.
+        '''
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except IOError:
+            return 0
+
+        if not data:
+            return 0
+        if len(data) < _HEADER.size or _HEADER.unpack_from(data)[0] != _MAGIC:
+            raise ValueError("%s is not a schyntax checkpoint file" % self.path)
+        if _HEADER.unpack_from(data)[1] != _VERSION:
+            raise ValueError("unsupported checkpoint version %d" % _HEADER.unpack_from(data)[1])
+
+        offset = _HEADER.size
+        while offset + _BATCH.size <= len(data):
+            length, checksum = _BATCH.unpack_from(data, offset)
+            start = offset + _BATCH.size
+            payload = data[start:start + length]
+            if len(payload) != length or zlib.crc32(payload) & 0xffffffff != checksum:
+                break
+
+            index = 0
+            while index < length:
+                ts, key_length = _RECORD.unpack_from(payload, index)
+                index += _RECORD.size
+                self._last[payload[index:index + key_length].decode('utf-8')] = ts
+                index += key_length
+
+            offset = start + length
+        return offset
+
+
+def catch_up(schedules, last_fired, now=None):
+    '''
+    Returns the events each schedule missed since it last fired, as a dict
+    of key to array('q') of epoch seconds (see Schedule.between()), holding
+    every event after last_fired[key] and at or before now (or the current
+    time). Keys without a last fire time, or with nothing missed, are left
+    out.
+
+    Schedules with the same text (ignoring whitespace) are enumerated only
+    once, over the window needed by the earliest of them, and each key
+    takes its slice of the result.
+    '''
+    if now is None:
+        now = datetime.datetime.utcnow()
+    stop = get_epoch_seconds(now) + 1
+
+    shared = {}
+    for key, schedule in schedules.items():
+        last = last_fired.get(key)
+        if last is None:
+            continue
+
+        text = normalize_schedule_text(schedule.original_text)
+        if text not in shared:
+            shared[text] = (schedule, [])
+        shared[text][1].append((get_epoch_seconds(last), key))
+
+    missed = {}
+    for schedule, members in shared.values():
+        first = min(ts for ts, key in members) + 1
+        if first >= stop:
+            continue
+
+        events = schedule.between(get_datetime_from_epoch_seconds(first), get_datetime_from_epoch_seconds(stop))
+        for ts, key in members:
+            index = bisect.bisect_right(events, ts)
+            if index < len(events):
+                missed[key] = events[index:]
+    return missed
@@ -0,0 +1,192 @@
+'''
+Scheduler which runs jobs on a concurrent.futures thread or process pool.
+
+This module needs concurrent.futures (Python 3, or the futures backport)
+and is not imported by the schyntax package itself, import it as
+schyntax.executor.
+'''
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from schyntax.scheduleset import ScheduleSet
+from schyntax.internals.dateutil import get_epoch_seconds, get_datetime_from_epoch_seconds
+
+
+__all__ = ['ExecutorScheduler', 'JobStats']
+
+
+# Longest single wait of the dispatcher, in seconds, so that wall-clock
+# adjustments are noticed.
+MAX_SLEEP = 60.0
+
+# Latencies are the seconds from the scheduled time of a run to when it
+# actually started in the pool.
+JobStats = namedtuple('JobStats', 'runs errors last_latency mean_latency max_latency')
+
+
+def _utcnow():
+    # the same clock the latencies are measured with
+    now = time.time()
+    return get_datetime_from_epoch_seconds(int(now)).replace(microsecond=int(now % 1 * 1000000))
+
+
+def _run_job(func, scheduled):
+    '''
+    Runs in the pool. Returns when the job started, along with its result,
+    so the latency can be measured where the job actually runs.
+    '''
+    started = time.time()
+    return started, func(scheduled)
+
+
+class _Job(object):
+    def __init__(self, func):
+        self.func = func
+        self.runs = 0
+        self.errors = 0
+        self.last_latency = None
+        self.total_latency = 0.0
+        self.max_latency = None
+
+
+class ExecutorScheduler(object):
+    '''
+    Dispatches the due jobs of many schedules to a concurrent.futures
+    executor. A single dispatcher thread waits for the earliest upcoming
+    event of all schedules, kept in a ScheduleSet, and submits each due job
+    to the pool, so slow jobs never hold up the others.
+
+    Each job is called as func(time) with the scheduled time of its event.
+    With a ProcessPoolExecutor, func must be picklable (a module-level
+    function). Several events of the same job becoming due at once, for
+    instance after the dispatcher was held up, submit the job only once, for
+    the latest of them.
+    '''
+    def __init__(self, executor=None):
+        '''
+        executor is the pool to run jobs on, by default a new
+        ThreadPoolExecutor which is shut down by stop(), and replaced by
+        another one if the scheduler is started again.
+        '''
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor()
+
+        self._schedules = ScheduleSet()
+        self._jobs = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, key):
+        return key in self._jobs
+
+    def add(self, key, schedule, func):
+        '''
+        Adds a job under the given key, replacing any job already stored
+        with that key. Its first run is for the next event from now.
+        '''
+        with self._condition:
+            self._jobs[key] = _Job(func)
+            self._schedules.add(key, schedule, _utcnow())
+            self._condition.notify()
+
+    def remove(self, key):
+        '''
+        Removes the job with the given key, if there is one. Runs which have
+        already been submitted are not cancelled.
+        '''
+        with self._condition:
+            self._jobs.pop(key, None)
+            self._schedules.remove(key)
+            self._condition.notify()
+
+    def stats(self, key):
+        '''
+        Returns a JobStats tuple for the given job. runs counts the runs
+        which returned and errors the ones which raised or could not be
+        submitted to the executor. The latencies are
+        those of the returned runs, and None until there is one.
+        '''
+        with self._condition:
+            job = self._jobs[key]
+            mean = job.total_latency / job.runs if job.runs else None
+            return JobStats(job.runs, job.errors, job.last_latency, mean, job.max_latency)
+
+    def start(self):
+        '''
+        Starts the dispatcher thread.
+        '''
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor()
+
+        self._thread = threading.Thread(target=self._dispatch, name='schyntax-dispatcher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, wait=True):
+        '''
+        Stops the dispatcher thread. If the executor was created by the
+        scheduler, it is shut down as well, waiting for running jobs when
+        wait is True.
+        '''
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def _dispatch(self):
+        with self._condition:
+            while self._running:
+                for scheduled, key in self._schedules.pop_latest_due(_utcnow()):
+                    self._submit(key, self._jobs[key], scheduled)
+
+                timeout = MAX_SLEEP
+                head = self._schedules.peek()
+                if head is not None:
+                    timeout = min(max((head[0] - _utcnow()).total_seconds(), 0), MAX_SLEEP)
+                self._condition.wait(timeout)
+
+    def _submit(self, key, job, scheduled):
+        try:
+            future = self._executor.submit(_run_job, job.func, scheduled)
+        except Exception:
+            # for instance a broken or shut down pool, which must not stop
+            # the dispatcher
+            job.errors += 1
+            return
+
+        future.add_done_callback(lambda future: self._finished(job, scheduled, future))
+
+    def _finished(self, job, scheduled, future):
+        with self._condition:
+            if future.cancelled() or future.exception() is not None:
+                # the start time is lost along with the result
+                job.errors += 1
+                return
+
+            started = future.result()[0]
+            # scheduled times are whole seconds
+            latency = started - get_epoch_seconds(scheduled)
+
+            job.runs += 1
+            job.last_latency = latency
+            job.total_latency += latency
+            if job.max_latency is None or latency > job.max_latency:
+                job.max_latency = latency
@@ -0,0 +1,174 @@
+'''
+Precomputed tables of fire times, shared between processes through a
+memory-mapped file.
+
+build_fire_table() writes the events of many schedules over a window once,
+and every worker process opens the file with FireTable, which answers
+next() and previous() with a binary search over the mapped memory instead
+of parsing and searching each schedule again.
+
+The events are stored in native byte order, tables are meant to be built
+and read on the same machine.
+'''
+import bisect
+import mmap
+import os
+import struct
+
+from schyntax.internals.dateutil import get_epoch_seconds, get_epoch_window, get_datetime_from_epoch_seconds
+from schyntax.exceptions import ValidTimeNotFoundException
+
+
+__all__ = ['build_fire_table', 'FireTable']
+
+
+_MAGIC = b'SCHF'
+_VERSION = 1
+
+# magic, version, window start and end (epoch seconds), number of events,
+# and the file offset of the index. 40 bytes, so the events which follow
+# are 8-byte aligned.
+_HEADER = struct.Struct('=4sB3xqqQQ')
+
+# index entry: position of the first event of the schedule, number of
+# events, and the length of the UTF-8 encoded key which follows
+_ENTRY = struct.Struct('=QQH')
+
+
+def build_fire_table(path, schedules, start, end):
+    '''
+    Writes every event of each schedule in the window [start, end) to a
+    fire table file. schedules is a dict of (string) key to Schedule.
+
+    The file is written under a temporary name and renamed into place, so
+    readers only ever see a complete table.
+    '''
+    first, stop = get_epoch_window(start, end)
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(b'\0' * _HEADER.size)
+
+        index = []
+        position = 0
+        for key, schedule in schedules.items():
+            events = schedule.between(start, end)
+            events.tofile(f)
+            index.append((key, position, len(events)))
+            position += len(events)
+
+        index_offset = f.tell()
+        for key, offset, count in index:
+            encoded = key.encode('utf-8')
+            f.write(_ENTRY.pack(offset, count, len(encoded)) + encoded)
+
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, _VERSION, first, stop, position, index_offset))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temp_path, path)
+
+
+class FireTable(object):
+    '''
+    Read-only view of a fire table file. The events stay in the mapped file
+    and are searched in place, so any number of processes can share one
+    copy of them through the page cache.
+
+    start and end are the window of the table in epoch seconds. Questions
+    whose answer could lie outside of it raise ValidTimeNotFoundException,
+    and should be asked of the Schedule itself.
+    '''
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError("%s is not a schyntax fire table" % path)
+        magic, version, self.start, self.end, count, index_offset = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC:
+            raise ValueError("%s is not a schyntax fire table" % path)
+        if version != _VERSION:
+            raise ValueError("unsupported fire table version %d" % version)
+
+        self._view = memoryview(self._mmap)
+        self._events = self._view[_HEADER.size:_HEADER.size + count * 8].cast('q')
+
+        self._index = {}
+        offset = index_offset
+        while offset < len(self._mmap):
+            position, length, key_length = _ENTRY.unpack_from(self._mmap, offset)
+            offset += _ENTRY.size
+            self._index[self._mmap[offset:offset + key_length].decode('utf-8')] = (position, position + length)
+            offset += key_length
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def close(self):
+        self._events.release()
+        self._view.release()
+        self._mmap.close()
+
+    def next(self, key, after):
+        '''
+        Same as Schedule.next() for the schedule stored under key.
+        '''
+        return get_datetime_from_epoch_seconds(self.next_epoch(key, get_epoch_seconds(after)))
+
+    def previous(self, key, at_or_before):
+        '''
+        Same as Schedule.previous() for the schedule stored under key.
+        '''
+        return get_datetime_from_epoch_seconds(self.previous_epoch(key, get_epoch_seconds(at_or_before)))
+
+    def next_epoch(self, key, ts):
+        '''
+        Returns the first event of the schedule stored under key strictly
+        after the given epoch seconds.
+        '''
+        ts = int(ts // 1)
+        low, high = self._index[key]
+        if ts < self.start - 1:
+            raise ValidTimeNotFoundException()
+
+        index = bisect.bisect_right(self._events, ts, low, high)
+        if index == high:
+            raise ValidTimeNotFoundException()
+        return self._events[index]
+
+    def previous_epoch(self, key, ts):
+        '''
+        Returns the last event of the schedule stored under key at or before
+        the given epoch seconds.
+        '''
+        ts = int(ts // 1)
+        low, high = self._index[key]
+        if ts >= self.end:
+            raise ValidTimeNotFoundException()
+
+        index = bisect.bisect_right(self._events, ts, low, high)
+        if index == low:
+            raise ValidTimeNotFoundException()
+        return self._events[index - 1]
+
+    def events(self, key):
+        '''
+        Returns a memoryview of the events of the schedule stored under key,
+        as epoch seconds in ascending order, without copying them.
+        '''
+        low, high = self._index[key]
+        return self._events[low:high]
@@ -0,0 +1,36 @@
+def next_bit(mask, index):
+    '''
+    Returns the position of the lowest set bit of mask at or above index,
+    or -1 if there is none.
+    '''
+    mask >>= index
+    if not mask:
+        return -1
+    return index + (mask & -mask).bit_length() - 1
+
+
+def previous_bit(mask, index):
+    '''
+    Returns the position of the highest set bit of mask at or below index,
+    or -1 if there is none.
+    '''
+    if index < 0:
+        return -1
+    return (mask & ((2 << index) - 1)).bit_length() - 1
+
+
+def iter_bits(mask):
+    '''
+    Yields the positions of the set bits of mask, lowest first.
+    '''
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def count_bits(mask):
+    '''
+    Returns the number of set bits of mask.
+    '''
+    return bin(mask).count('1')
@@ -0,0 +1,562 @@
+import re
+
+from schyntax.internals.parser import parse
+from schyntax.internals.bitutil import next_bit, previous_bit
+from schyntax.internals.dateutil import get_days_in_month, get_days_in_previous_month, get_year_start_ordinal, get_year_from_ordinal, \
+    get_ordinal, get_day_of_year, get_day_of_week, is_leap_year
+from schyntax.internals.lru import LRUCache
+from schyntax.internals.period import detect_period
+from schyntax.exceptions import InvalidScheduleException
+
+
+# Number of per-year day bitmaps kept by each CompiledGroup. A search
+# window of 367 days touches at most three calendar years.
+YEAR_CACHE_SIZE = 8
+
+# Default number of distinct schedule strings kept by the parse cache.
+PARSE_CACHE_SIZE = 1024
+
+# (compiled groups, period) by whitespace-normalized schedule text
+parse_cache = LRUCache(PARSE_CACHE_SIZE)
+
+# only the whitespace skipped by the lexer can be normalized away
+_whitespace_re = re.compile(r'[ \t\r\n]+')
+
+
+class CompiledGroup(object):
+    '''
+    A parsed Group along with precomputed membership masks for its
+    integer-valued units. Bit n of a mask is set when the value n satisfies
+    both the include and exclude lists of that unit, so matching a value is
+    a single bit test instead of a scan over every Range.
+
+    Day-level rules (dates, days of month and days of week) are resolved
+    lazily into one bitmap of valid days per calendar year.
+    '''
+    def __init__(self, group, masks=None):
+        '''
+        masks is an optional (seconds, minutes, hours, days of week, days of
+        month) tuple of the masks of a group which has been compiled before,
+        to restore it without compiling or checking it again.
+        '''
+        self.group = group
+        self._years = LRUCache(YEAR_CACHE_SIZE)
+
+        if masks is None:
+            self.seconds_mask = _compile_mask(group.seconds, group.seconds_excluded, 0, 59)
+            self.minutes_mask = _compile_mask(group.minutes, group.minutes_excluded, 0, 59)
+            self.hours_mask = _compile_mask(group.hours, group.hours_excluded, 0, 23)
+
+            # days of week are 1 (sunday) through 7 (saturday), so bit 0 is never set
+            self.days_of_week_mask = _compile_mask(group.days_of_week, group.days_of_week_excluded, 1, 7)
+
+            # valid days of month for each combination of month lengths, if limited
+            self._dom_masks = None
+            if group.days_of_month or group.days_of_month_excluded:
+                self._dom_masks = _compile_dom_masks(group.days_of_month, group.days_of_month_excluded)
+        else:
+            self.seconds_mask, self.minutes_mask, self.hours_mask, self.days_of_week_mask, self._dom_masks = masks
+
+        # whether dates or days of month restrict the valid days beyond the day-of-week mask
+        self.has_day_rules = bool(group.dates or group.dates_excluded or group.days_of_month or group.days_of_month_excluded)
+
+        # only groups which can match are kept, so restored ones can
+        self.can_match = masks is not None or self._can_match()
+
+        # the years which can contain an included date, if they are limited
+        self._year_spans = _compile_year_spans(group.dates)
+
+    def _can_match(self):
+        '''
+        Returns False if the rules of the group contradict each other, so
+        that it can never match any time. Returns True when it can match, or
+        when that depends on the year and isn't worth deciding up front.
+        '''
+        if not (self.seconds_mask and self.minutes_mask and self.hours_mask and self.days_of_week_mask):
+            return False
+
+        if not self.has_day_rules:
+            return True
+
+        group = self.group
+        if not (group.dates or group.dates_excluded):
+            # Over the years every day of month falls on every day of the
+            # week, so a day passing the masks of any actual pair of month
+            # lengths is enough.
+            return any(self._dom_masks[variant] for variant in _DOM_VARIANTS)
+
+        for rng in group.dates + group.dates_excluded:
+            if rng.start.year is not None or rng.interval != 1:
+                return True
+
+        # Without years or intervals, dates and days of month only depend on
+        # the month, the day and whether it is a leap year. Over the years
+        # every such day falls on every day of the week, so a leap year and a
+        # common year settle it.
+        for year in (2000, 2001):
+            for month in range(1, 13):
+                for day_of_month in range(1, get_days_in_month(year, month) + 1):
+                    if self._is_valid_date(year, month, day_of_month):
+                        return True
+        return False
+
+    def days_in_year(self, year):
+        '''
+        Returns a bitmap of the valid days of the given year. Bit n is set
+        when the day with (zero-based) day of year n passes all day-level
+        rules of the group.
+        '''
+        days = self._years.get(year)
+        if days is None:
+            days = self._compile_year(year)
+            self._years.put(year, days)
+        return days
+
+    def _compile_year(self, year):
+        year_start = get_year_start_ordinal(year)
+
+        day_of_week = get_day_of_week(year_start)
+
+        days = 0
+        index = 0
+        for month in range(1, 13):
+            for day_of_month in range(1, get_days_in_month(year, month) + 1):
+                if self.days_of_week_mask >> day_of_week & 1 and self._is_valid_date(year, month, day_of_month, year_start + index):
+                    days |= 1 << index
+
+                index += 1
+                # saturday (7) wraps around to sunday (1)
+                day_of_week = day_of_week % 7 + 1
+        return days
+
+    def _is_valid_date(self, year, month, day_of_month, ordinal=None):
+        '''
+        Checks the date and day-of-month rules, but not the day of week.
+        The ordinal of the date can be passed in when it's already known.
+        '''
+        group = self.group
+
+        # "check if today is an applicable date"
+        if group.dates and not in_date_rule(group.dates, year, month, day_of_month, ordinal):
+            return False
+
+        if group.dates_excluded and in_date_rule(group.dates_excluded, year, month, day_of_month, ordinal):
+            return False
+
+        # "check if date is an applicable day of month"
+        if self._dom_masks is not None:
+            dom_mask = self._dom_masks[_get_dom_variant(get_days_in_month(year, month), get_days_in_previous_month(year, month))]
+            if not dom_mask >> day_of_month & 1:
+                return False
+
+        return True
+
+    def is_valid_day(self, ordinal):
+        '''
+        Checks all day-level rules for the day with the given ordinal.
+        '''
+        if not self.has_day_rules:
+            return bool(self.days_of_week_mask >> get_day_of_week(ordinal) & 1)
+
+        year = get_year_from_ordinal(ordinal)
+        return bool(self.days_in_year(year) >> (ordinal - get_year_start_ordinal(year)) & 1)
+
+    def matches(self, ordinal, hour, minute, second):
+        '''
+        Checks whether the group has an event at the given day and time.
+        '''
+        return bool(self.hours_mask >> hour & self.minutes_mask >> minute & self.seconds_mask >> second & 1) \
+            and self.is_valid_day(ordinal)
+
+    def find_day(self, ordinal, limit, is_after):
+        '''
+        Returns the proleptic Gregorian ordinal of the first valid day from
+        ordinal towards limit (both inclusive), searching forwards when
+        is_after is True. Returns None if there is no valid day in between.
+        '''
+        if not self.has_day_rules:
+            # only the day of week matters, so one of the next seven days is
+            # valid (impossible groups never make it past compile_groups)
+            inc = 1 if is_after else -1
+            for i in range(7):
+                if (ordinal > limit) if is_after else (ordinal < limit):
+                    return None
+
+                if self.days_of_week_mask >> get_day_of_week(ordinal) & 1:
+                    return ordinal
+                ordinal += inc
+            return None
+
+        while (ordinal <= limit) if is_after else (ordinal >= limit):
+            year = get_year_from_ordinal(ordinal)
+
+            if self._year_spans is not None:
+                # jump straight over years outside of every absolute date range
+                possible_year = self._find_year(year, is_after)
+                if possible_year is None:
+                    return None
+
+                if possible_year != year:
+                    year = possible_year
+                    if is_after:
+                        ordinal = get_year_start_ordinal(year)
+                    else:
+                        ordinal = get_year_start_ordinal(year + 1) - 1
+                    continue
+
+            year_start = get_year_start_ordinal(year)
+            days = self.days_in_year(year)
+
+            if is_after:
+                index = next_bit(days, ordinal - year_start)
+            else:
+                index = previous_bit(days, ordinal - year_start)
+
+            if index != -1:
+                found = year_start + index
+                if (found <= limit) if is_after else (found >= limit):
+                    return found
+                return None
+
+            # "nothing left in this year, move on to the next one"
+            if is_after:
+                ordinal = get_year_start_ordinal(year + 1)
+            else:
+                ordinal = year_start - 1
+
+        return None
+
+    def _find_year(self, year, is_after):
+        '''
+        Returns the nearest year from year in the search direction which is
+        covered by a year span, or None.
+        '''
+        found = None
+        for first, last in self._year_spans:
+            if is_after and last >= year:
+                candidate = max(first, year)
+                if found is None or candidate < found:
+                    found = candidate
+            elif not is_after and first <= year:
+                candidate = min(last, year)
+                if found is None or candidate > found:
+                    found = candidate
+        return found
+
+    def find_time(self, hour, minute, second, is_after):
+        '''
+        Returns the first matching (hour, minute, second) tuple at or after
+        the given time of day, or at or before it when is_after is False.
+        Returns None if no time is left in that direction.
+
+        Each unit jumps straight to its next set bit, and carries into the
+        next larger unit when it runs off the end of its mask.
+        '''
+        if not (self.hours_mask and self.minutes_mask and self.seconds_mask):
+            return None
+
+        if is_after:
+            scan = next_bit
+            inc = 1
+            first = 0
+        else:
+            scan = previous_bit
+            inc = -1
+            first = 59
+
+        while True:
+            found_hour = scan(self.hours_mask, hour)
+            if found_hour == -1:
+                return None
+
+            if found_hour != hour:
+                minute = second = first
+
+            while True:
+                found_minute = scan(self.minutes_mask, minute)
+                if found_minute == -1:
+                    break
+
+                if found_minute != minute:
+                    second = first
+
+                found_second = scan(self.seconds_mask, second)
+                if found_second != -1:
+                    return found_hour, found_minute, found_second
+
+                # "carry into the next minute"
+                minute = found_minute + inc
+                second = first
+
+            # "carry into the next hour"
+            hour = found_hour + inc
+            minute = second = first
+
+
+def _compile_mask(ranges, excluded, min, max):
+    length_of_unit = max - min + 1
+
+    if ranges:
+        mask = _compile_rule_mask(ranges, length_of_unit, min, max)
+    else:
+        mask = _get_value_mask(min, max)
+
+    if excluded:
+        mask &= ~_compile_rule_mask(excluded, length_of_unit, min, max)
+    return mask
+
+
+def _compile_rule_mask(ranges, length_of_unit, low, high):
+    '''
+    Returns a mask of the values from low to high which are in any of the
+    ranges. A value is in a range when it lies between the start and the
+    end and is a multiple of the interval away from the start, except for
+    the end of a half-open range. In split ranges (start > end) the values
+    up to the end count from the start one length_of_unit earlier.
+
+    The bits are set by stepping through each range by its interval,
+    rather than testing every value.
+    '''
+    mask = 0
+    for rng in ranges:
+        if rng.start <= rng.end:
+            range_mask = _step_mask(rng.start, rng.interval, max(rng.start, low), min(rng.end, high))
+        else:
+            # split range, the values after the wrap count the interval from
+            # the start as if it were one unit earlier
+            range_mask = _step_mask(rng.start, rng.interval, max(rng.start, low), high) \
+                | _step_mask(rng.start - length_of_unit, rng.interval, low, min(rng.end, high))
+
+        if rng.is_half_open and low <= rng.end <= high:
+            range_mask &= ~(1 << rng.end)
+
+        mask |= range_mask
+    return mask
+
+
+def _step_mask(anchor, interval, low, high):
+    '''
+    Returns a mask of the values from low to high which are a multiple of
+    interval away from anchor.
+    '''
+    if low > high:
+        return 0
+    if interval == 1:
+        return _get_value_mask(low, high)
+
+    mask = 0
+    for value in range(low + (anchor - low) % interval, high + 1, interval):
+        mask |= 1 << value
+    return mask
+
+
+def _get_value_mask(low, high):
+    # bits low through high
+    return (2 << high) - (1 << low)
+
+
+def _get_dom_variant(days_in_month, days_in_previous_month):
+    # month lengths are 28 to 31 days
+    return (days_in_month - 28) * 4 + days_in_previous_month - 28
+
+
+# the variants which occur in the calendar, those of a leap and a common year
+_DOM_VARIANTS = frozenset(_get_dom_variant(get_days_in_month(year, month), get_days_in_previous_month(year, month))
+                          for year in (2000, 2001) for month in range(1, 13))
+
+
+def _compile_dom_masks(ranges, excluded):
+    '''
+    Returns a tuple of day-of-month masks, one for every combination of the
+    length of the month and of the previous month, indexed by
+    _get_dom_variant(). Negative days and split ranges only depend on those
+    two lengths, so resolving them here leaves a bit test per day.
+    '''
+    masks = []
+    for days_in_month in range(28, 32):
+        # negative days only depend on the length of the month
+        resolved = [_resolve_dom_range(rng, days_in_month) for rng in ranges]
+        resolved_excluded = [_resolve_dom_range(rng, days_in_month) for rng in excluded]
+
+        # and the previous month only matters for intervals of split ranges
+        uses_previous_month = any(rng.start > rng.end and rng.interval != 1 for rng in resolved + resolved_excluded)
+
+        for days_in_previous_month in range(28, 32):
+            if days_in_previous_month > 28 and not uses_previous_month:
+                masks.append(masks[-1])
+                continue
+
+            # the days of a split range wrap around the previous month
+            if resolved:
+                mask = _compile_rule_mask(resolved, days_in_previous_month, 1, days_in_month)
+            else:
+                mask = _get_value_mask(1, days_in_month)
+            if resolved_excluded:
+                mask &= ~_compile_rule_mask(resolved_excluded, days_in_previous_month, 1, days_in_month)
+            masks.append(mask)
+    return tuple(masks)
+
+
+def _compile_year_spans(dates):
+    '''
+    Returns the (first, last) year spans of the included date ranges, or
+    None if any of them matches in every year.
+    '''
+    if not dates:
+        return None
+
+    spans = []
+    for rng in dates:
+        if rng.start.year is None:
+            return None
+        spans.append((rng.start.year, rng.end.year))
+    return spans
+
+
+def compile_groups(groups):
+    '''
+    Compiles the parsed groups, dropping any group which can never match.
+    Raises InvalidScheduleException if no group is left.
+    '''
+    compiled = [CompiledGroup(group) for group in groups]
+
+    compiled = [group for group in compiled if group.can_match]
+    if not compiled:
+        raise InvalidScheduleException("Schedule can never match any time.")
+    return compiled
+
+
+def normalize_schedule_text(string):
+    '''
+    Returns the schedule string with its whitespace normalized, so that
+    strings which only differ in whitespace compare equal.
+    '''
+    return _whitespace_re.sub(' ', string).strip(' ')
+
+
+def compile_schedule(string):
+    '''
+    Returns a (groups, period) tuple for a schedule string: the compiled
+    groups, and their Period if the next()/previous() fast path applies to
+    them (see detect_period()). The result is reused for any string seen
+    before that differs only in whitespace, the groups are shared between
+    callers and must not be modified.
+    '''
+    key = normalize_schedule_text(string)
+
+    compiled = parse_cache.get(key)
+    if compiled is None:
+        # parse the original string, so error positions refer to it
+        groups = compile_groups(parse(string))
+        compiled = (groups, detect_period(groups))
+        parse_cache.put(key, compiled)
+    return compiled
+
+
+def in_date_rule(ranges, year, month, day_of_month, ordinal=None):
+    for rng in ranges:
+        if in_date_range(rng, year, month, day_of_month, ordinal):
+            return True
+    return False
+
+
+def in_date_range(rng, year, month, day_of_month, ordinal=None):
+    if rng.is_half_open:
+        if rng.end.day == day_of_month and rng.end.month == month and (rng.end.year is None or rng.end.year == year):
+            return False
+
+    is_split = False
+
+    # check if in between start and end dates
+    if rng.start.year is not None:
+        # absolute dates with years. both will have years or neither will.
+
+        if year < rng.start.year or year > rng.end.year:
+            return False
+
+        if year == rng.start.year and _compare_month_and_day(month, day_of_month, rng.start.month, rng.start.day) < 0:
+            return False
+
+        if year == rng.end.year and _compare_month_and_day(month, day_of_month, rng.end.month, rng.end.day) > 0:
+            return False
+
+    elif rng.start > rng.end:
+        # split range
+        # "split ranges aren't allowed to have years (it wouldn't make any sense)"
+        is_split = True
+
+        if month == rng.start.month or month == rng.end.month:
+            if month == rng.start.month and day_of_month < rng.start.day:
+                return False
+
+            if month == rng.end.month and day_of_month > rng.end.day:
+                return False
+
+        elif not (month < rng.end.month or month > rng.start.month):
+            return False
+
+    else:
+        # "not a split range, and no year information - just month and day to go on"
+        if _compare_month_and_day(month, day_of_month, rng.start.month, rng.start.day) < 0:
+            return False
+        if _compare_month_and_day(month, day_of_month, rng.end.month, rng.end.day) > 0:
+            return False
+
+    # If we get here, then we're definitely somewhere within the range.
+    # If there's no interval, then there's nothing else we need to check
+    if rng.interval == 1:  # I just made nonspecified intervals unify to a 1
+        return True
+
+    # "figure out the actual date of the low date so we know whether we're on the desired interval"
+    if rng.start.year is not None:
+        start_year = rng.start.year
+    elif is_split and month <= rng.end.month:
+        # "start date is from the previous year"
+        start_year = year - 1
+    else:
+        start_year = year
+
+    if ordinal is None:
+        ordinal = get_ordinal(year, month, day_of_month)
+
+    return (ordinal - _get_interval_start(rng.start, start_year)) % rng.interval == 0
+
+
+def _get_interval_start(start, start_year):
+    '''
+    Returns the ordinal of the day from which the interval of a date range
+    is counted, in the given year.
+    '''
+    start_day = start.day
+
+    # "check if start date was actually supposed to be February 29th, but isn't because of non-leap-year."
+    if start.month == 2 and start_day == 29 and not is_leap_year(start_year):
+        # "bump the start day back to February 28th so that interval schemes work based on that imaginary date"
+        # "but seriously, people should probably just expect weird results if they're doing something that stupid."
+        start_day = 28
+
+    return get_year_start_ordinal(start_year) + get_day_of_year(start_year, start.month, start_day)
+
+
+def _compare_month_and_day(m1, d1, m2, d2):
+    if m1 < m2 or (m1 == m2 and d1 < d2):
+        return -1
+    if m2 < m1 or (m2 == m1 and d2 < d1):
+        return 1
+    return 0
+
+
+def _resolve_dom_range(rng, days_in_month):
+    # if either range value is negative, convert to positive by counting back from end of the month
+    if rng.start < 0 or rng.end < 0:
+        start = rng.start
+        if start < 0:
+            start = days_in_month + start + 1
+
+        end = rng.end
+        if end < 0:
+            end = days_in_month + end + 1
+
+        rng = rng._replace(start=start, end=end)
+
+    return rng
@@ -0,0 +1,120 @@
+from schyntax.internals.bitutil import iter_bits, count_bits
+from schyntax.internals.dateutil import EPOCH_ORDINAL, get_year_start_ordinal, get_year_from_ordinal
+
+
+def count_times(groups, first=0, stop=86400):
+    '''
+    Returns how many times of day, as whole seconds since midnight in the
+    range [first, stop), are matched by at least one of the groups.
+
+    Each (hour, minute) is one bit test per group, and the seconds of the
+    groups allowing it are merged into a single mask, so overlapping groups
+    are only counted once.
+    '''
+    hours_mask = 0
+    minutes_mask = 0
+    for compiled in groups:
+        hours_mask |= compiled.hours_mask
+        minutes_mask |= compiled.minutes_mask
+
+    count = 0
+    for hour in iter_bits(hours_mask):
+        if hour * 3600 >= stop or hour * 3600 + 3600 <= first:
+            continue
+
+        for minute in iter_bits(minutes_mask):
+            start = hour * 3600 + minute * 60
+            if start >= stop or start + 60 <= first:
+                continue
+
+            seconds = 0
+            for compiled in groups:
+                if compiled.hours_mask >> hour & compiled.minutes_mask >> minute & 1:
+                    seconds |= compiled.seconds_mask
+
+            if start < first:
+                seconds &= -1 << (first - start)
+            if start + 60 > stop:
+                seconds &= (1 << (stop - start)) - 1
+            count += count_bits(seconds)
+    return count
+
+
+def _get_year_days(compiled, year):
+    if compiled._year_spans is not None and compiled._find_year(year, True) != year:
+        # outside of every absolute date range
+        return 0
+    return compiled.days_in_year(year)
+
+
+def _count_days(groups, first, last):
+    '''
+    Returns a dict mapping a bitset of groups to the number of days from
+    first to last (ordinals, inclusive) on which exactly those groups are
+    valid. Days are partitioned a year at a time, with one bitmap per
+    distinct set of groups.
+    '''
+    counts = {}
+    year = get_year_from_ordinal(first)
+    while True:
+        year_start = get_year_start_ordinal(year)
+        if year_start > last:
+            break
+
+        low = max(first, year_start) - year_start
+        high = min(last, get_year_start_ordinal(year + 1) - 1) - year_start
+        partitions = {0: ((2 << high) - 1) & (-1 << low)}
+
+        for i, compiled in enumerate(groups):
+            valid = _get_year_days(compiled, year)
+            split = {}
+            for signature, days in partitions.items():
+                if days & valid:
+                    split[signature | 1 << i] = days & valid
+                if days & ~valid:
+                    split[signature] = days & ~valid
+            partitions = split
+
+        for signature, days in partitions.items():
+            counts[signature] = counts.get(signature, 0) + count_bits(days)
+        year += 1
+    return counts
+
+
+def _select(groups, signature):
+    return [groups[i] for i in iter_bits(signature)]
+
+
+def _get_signature(groups, ordinal):
+    signature = 0
+    for i, compiled in enumerate(groups):
+        if compiled.is_valid_day(ordinal):
+            signature |= 1 << i
+    return signature
+
+
+def count_events(groups, first, stop):
+    '''
+    Returns the number of events in the window [first, stop), given in
+    epoch seconds, without enumerating them.
+    '''
+    if first >= stop:
+        return 0
+
+    first_day = first // 86400 + EPOCH_ORDINAL
+    last_day = (stop - 1) // 86400 + EPOCH_ORDINAL
+    first_time = first % 86400
+    stop_time = (stop - 1) % 86400 + 1
+
+    if first_day == last_day:
+        return count_times(_select(groups, _get_signature(groups, first_day)), first_time, stop_time)
+
+    # partial days at both ends of the window
+    count = count_times(_select(groups, _get_signature(groups, first_day)), first_time) \
+        + count_times(_select(groups, _get_signature(groups, last_day)), 0, stop_time)
+
+    if first_day + 1 < last_day:
+        for signature, days in _count_days(groups, first_day + 1, last_day - 1).items():
+            if signature:
+                count += days * count_times(_select(groups, signature))
+    return count
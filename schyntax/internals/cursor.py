@@ -0,0 +1,55 @@
+class GroupCursor(object):
+    '''
+    Resumable search position within a single CompiledGroup.
+
+    The cursor remembers the day (as a proleptic Gregorian ordinal) and the
+    time of day where the search should continue, so that repeated calls to
+    advance() walk through the group's events in order without restarting
+    the day scan.
+    '''
+    def __init__(self, compiled, ordinal, hour, minute, second, is_after):
+        self.compiled = compiled
+        self.is_after = is_after
+
+        self.ordinal = ordinal
+        self.hour = hour
+        self.minute = minute
+        self.second = second
+
+    def _move_to_day(self, ordinal):
+        self.ordinal = ordinal
+        if self.is_after:
+            self.hour, self.minute, self.second = 0, 0, 0
+        else:
+            self.hour, self.minute, self.second = 23, 59, 59
+
+    def advance(self, limit):
+        '''
+        Returns the next event as an (ordinal, hour, minute, second) tuple,
+        and moves the cursor past it. Returns None if there is no event up to
+        and including the day given by limit. In that case the cursor is left
+        just past limit, so a later call with a wider limit resumes there.
+        '''
+        compiled = self.compiled
+        is_after = self.is_after
+        inc = 1 if is_after else -1
+
+        while True:
+            day = compiled.find_day(self.ordinal, limit, is_after)
+            if day is None:
+                if (self.ordinal <= limit) if is_after else (self.ordinal >= limit):
+                    self._move_to_day(limit + inc)
+                return None
+
+            if day != self.ordinal:
+                self._move_to_day(day)
+
+            time = compiled.find_time(self.hour, self.minute, self.second, is_after)
+            if time is not None:
+                hour, minute, second = time
+
+                # the second may step out of 0..59 here, find_time carries it
+                self.hour, self.minute, self.second = hour, minute, second + inc
+                return day, hour, minute, second
+
+            self._move_to_day(day + inc)
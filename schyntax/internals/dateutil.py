@@ -1,8 +1,22 @@
-import calendar
+import datetime
+
+
+# days in each month of a common year, indexed by month (1-12)
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+# days in a common year before the first of each month, indexed by month (1-12)
+_DAYS_BEFORE_MONTH = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+
+def is_leap_year(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
 
 
 def get_days_in_month(year, month):
-    return calendar.monthrange(year, month)[1]
+    if month == 2 and is_leap_year(year):
+        return 29
+    return _DAYS_IN_MONTH[month]
 
 
 def get_days_in_previous_month(year, month):
@@ -11,3 +25,117 @@ def get_days_in_previous_month(year, month):
         year -= 1
         month = 12
     return get_days_in_month(year, month)
+
+
+# proleptic Gregorian ordinal of the unix epoch, 1970-01-01
+EPOCH_ORDINAL = 719163
+
+
+def get_epoch_seconds(dt):
+    '''
+    Returns the whole seconds since the unix epoch for a naive UTC datetime,
+    dropping any fractional part.
+    '''
+    return get_epoch_seconds_from_ordinal(dt.toordinal(), dt.hour, dt.minute, dt.second)
+
+
+def get_epoch_seconds_from_ordinal(ordinal, hour=0, minute=0, second=0):
+    '''
+    Returns the seconds since the unix epoch for a time of day on the day
+    with the given ordinal.
+    '''
+    return (ordinal - EPOCH_ORDINAL) * 86400 + hour * 3600 + minute * 60 + second
+
+
+def get_datetime_from_epoch_seconds(ts):
+    '''
+    Returns the naive UTC datetime for whole seconds since the unix epoch,
+    the inverse of get_epoch_seconds().
+    '''
+    days, seconds = divmod(ts, 86400)
+    hour, seconds = divmod(seconds, 3600)
+    minute, second = divmod(seconds, 60)
+    return datetime.datetime(*(get_date_from_ordinal(days + EPOCH_ORDINAL) + (hour, minute, second)))
+
+
+def get_epoch_window(start, end):
+    '''
+    Returns the half-open window [start, end) of two naive UTC datetimes as
+    whole epoch seconds, rounding both up to the next whole second.
+    '''
+    first = get_epoch_seconds(start)
+    if start.microsecond:
+        first += 1
+
+    stop = get_epoch_seconds(end)
+    if end.microsecond:
+        stop += 1
+    return first, stop
+
+
+# The functions below work on proleptic Gregorian ordinals, the same day
+# numbers as datetime.date.toordinal(), using integer arithmetic only.
+
+def get_year_start_ordinal(year):
+    '''
+    Returns the ordinal of January 1st of the given year.
+    '''
+    y = year - 1
+    return y * 365 + y // 4 - y // 100 + y // 400 + 1
+
+
+def get_year_from_ordinal(ordinal):
+    # 146097 days per 400 years. The estimate is off by at most one year.
+    year = (ordinal * 400) // 146097 + 1
+    if get_year_start_ordinal(year) > ordinal:
+        year -= 1
+    elif get_year_start_ordinal(year + 1) <= ordinal:
+        year += 1
+    return year
+
+
+def get_day_of_week(ordinal):
+    '''
+    Returns the day of week of the given ordinal, as sun=1 .. sat=7. Works
+    on NumPy arrays of ordinals as well.
+    '''
+    # ordinal 1 is a monday
+    return ordinal % 7 + 1
+
+
+def get_day_of_year(year, month, day):
+    '''
+    Returns the zero-based day of year of the given date.
+    '''
+    if month > 2 and is_leap_year(year):
+        return _DAYS_BEFORE_MONTH[month] + day
+    return _DAYS_BEFORE_MONTH[month] + day - 1
+
+
+def get_ordinal(year, month, day):
+    '''
+    Returns the ordinal of the given date.
+    '''
+    # days_from_civil, counting years from March so that leap days come last
+    y = year - (month <= 2)
+    era = y // 400
+    year_of_era = y - era * 400
+    day_of_year = (153 * (month - 3 if month > 2 else month + 9) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468 + EPOCH_ORDINAL
+
+
+def get_date_from_ordinal(ordinal):
+    '''
+    Returns a (year, month, day) tuple for the given ordinal.
+    '''
+    # civil_from_days, the inverse of get_ordinal()
+    z = ordinal - EPOCH_ORDINAL + 719468
+    era = z // 146097
+    day_of_era = z - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    mp = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * mp + 2) // 5 + 1
+    month = mp + 3 if mp < 10 else mp - 9
+    return year_of_era + era * 400 + (month <= 2), month, day
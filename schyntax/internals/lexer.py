@@ -7,37 +7,57 @@ from schyntax.exceptions import SchyntaxParseException
 _RegexType = type(re.compile(""))
 
 
+def _build_token_regex():
+    '''
+    Combines the patterns of all token types into a single regex, with one
+    named group per token type. The alternatives keep the order of the
+    token_types list, so earlier types still win, and leading whitespace is
+    skipped by the same match.
+    '''
+    alternatives = []
+    group_types = {}
+
+    for token_type in token_types:
+        # skip end of input token type
+        if token_type.pattern is None:
+            continue
+
+        if isinstance(token_type.pattern, _RegexType):
+            pattern = token_type.pattern.pattern
+        else:
+            # plain string pattern
+            pattern = re.escape(token_type.pattern)
+
+        name = 'type%d' % token_type.type
+        alternatives.append('(?P<%s>%s)' % (name, pattern))
+        group_types[name] = token_type.type
+
+    return re.compile(r'[ \t\r\n]*(?:%s)' % '|'.join(alternatives)), group_types
+
+
+_token_regex, _group_types = _build_token_regex()
+_whitespace_regex = re.compile(r'[ \t\r\n]*')
+
+
 def tokenize(input):
     '''
     Generator that yields a series of Token instances for the input string.
     '''
     index = 0
     length = len(input)
-    
+    match_token = _token_regex.match
+
     while index < length:
-        # skip and ignore whitespace
-        if input[index] in ' \t\r\n':
-            index += 1
-            continue
-        
-        # then check the list of token types, in order.
-        for token_type in token_types:
-            # skip end of input token type
-            if token_type.pattern is None:
-                continue
-            
-            if isinstance(token_type.pattern, _RegexType):
-                match = token_type.pattern.match(input, index)
-                if match:
-                    yield Token(token_type.type, match.group(), index)
-                    index = match.end()
-                    break
-            else:
-                # plain string pattern
-                if input[index : index + len(token_type.pattern)] == token_type.pattern:
-                    yield Token(token_type.type, token_type.pattern, index)
-                    index += len(token_type.pattern)
-                    break
-        else:
+        match = match_token(input, index)
+        if match is None:
+            # either only whitespace is left, or a syntax error after it
+            index = _whitespace_regex.match(input, index).end()
+            if index == length:
+                break
+
             # FIXME - better error message
             raise SchyntaxParseException("syntax error near: %s" % input[index:], input, index)
+
+        name = match.lastgroup
+        yield Token(_group_types[name], match.group(name), match.start(name))
+        index = match.end()
@@ -0,0 +1,68 @@
+import numbers
+import threading
+from collections import OrderedDict, namedtuple
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+class LRUCache(object):
+    '''
+    Bounded, thread-safe mapping which discards the least recently used
+    entry once more than maxsize entries are stored. Lookups are counted as
+    hits or misses.
+    '''
+    def __init__(self, maxsize):
+        _check_maxsize(maxsize)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+
+            # re-insert to mark as most recently used
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            self._trim()
+
+    def resize(self, maxsize):
+        _check_maxsize(maxsize)
+        with self._lock:
+            self.maxsize = maxsize
+            self._trim()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def _trim(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+def _check_maxsize(maxsize):
+    if not isinstance(maxsize, numbers.Integral) or maxsize < 0:
+        raise ValueError("maxsize must be a non-negative integer")
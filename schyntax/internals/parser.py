@@ -1,3 +1,5 @@
+from collections import namedtuple
+
 from schyntax.internals import token
 from schyntax.internals.lexer import tokenize
 from schyntax.internals.dateutil import get_days_in_month
@@ -82,75 +84,72 @@ _day_of_week_literals = {
 
 
 # Internal, used during parsing
-class Argument(object):
-    is_exclusion = False
-    
-    is_wildcard = False
-    
-    start = None
-    end = None              # None if not specified
-    is_half_open = False
-    
-    interval = None         # None if not specified
+class Argument(namedtuple('Argument', 'is_exclusion is_wildcard start end is_half_open interval')):
+    # end is None if not specified
+    # interval is None if not specified
+    __slots__ = ()
+
+
+_group_fields = (
+    'dates',
+    'dates_excluded',
+    'days_of_month',
+    'days_of_month_excluded',
+    'days_of_week',
+    'days_of_week_excluded',
+    'hours',
+    'hours_excluded',
+    'minutes',
+    'minutes_excluded',
+    'seconds',
+    'seconds_excluded',
+)
+
+
+class Group(namedtuple('Group', _group_fields)):
+    # each of these is a tuple of Range instances
+    __slots__ = ()
 
 
-class Group(object):
+# Internal, used during parsing. Collects the rules of a group before they
+# are frozen into a Group.
+class _GroupBuilder(object):
     def __init__(self):
         # each of these is a list of Range instances
-        self.dates = []
-        self.dates_excluded = []
-        self.days_of_month = []
-        self.days_of_month_excluded = []
-        self.days_of_week = []
-        self.days_of_week_excluded = []
-        self.hours = []
-        self.hours_excluded = []
-        self.minutes = []
-        self.minutes_excluded = []
-        self.seconds = []
-        self.seconds_excluded = []
+        for field in _group_fields:
+            setattr(self, field, [])
+    
+    def build(self):
+        return Group(*[tuple(getattr(self, field)) for field in _group_fields])
 
 
 # slightly differing from C# project. skipping "IsRange" and "HasInterval"
 # Could add those as properties?
-class Range(object):
-    start = None
-    end = None              # always non-none, even if no range specified (equal to start)
-    is_half_open = False
-    interval = None         # always non-none, even if no interval specified (assigned to 1)
+class Range(namedtuple('Range', 'start end is_half_open interval')):
+    # end is always non-none, even if no range specified (equal to start)
+    # interval is always non-none, even if no interval specified (assigned to 1)
+    __slots__ = ()
     
-    def __init__(self, start, end, is_half_open=False, interval=1):
+    def __new__(cls, start, end, is_half_open=False, interval=1):
         assert end is not None
         assert interval is not None
         
-        self.start = start
-        self.end = end
-        self.is_half_open = is_half_open
-        self.interval = interval
-    
-    def clone(self):
-        return Range(self.start, self.end, self.is_half_open, self.interval)
+        return super(Range, cls).__new__(cls, start, end, is_half_open, interval)
 
 
-class DateValue(object):
-    year = None         # None if not specified
-    month = None
-    day = None
+class DateValue(namedtuple('DateValue', 'year month day')):
+    # year is None if not specified
+    __slots__ = ()
     
-    def __init__(self, year, month, day):
-        self.year = year
-        self.month = month
-        self.day = day
-
-    def __eq__(self, other):
-        return self.year == other.year and self.month == other.month and self.day == other.day
-        
     def __lt__(self, other):
         # not valid to compare full and partial dates
         if (self.year is None) != (other.year is None):
             raise Exception("cannot compare full and partial dates")
         
         return (self.year, self.month, self.day) < (other.year, other.month, other.day)
+    
+    def __gt__(self, other):
+        return other < self
 
 
 class Parser(object):
@@ -232,7 +231,7 @@ class Parser(object):
             
             elif self._is_next(token.TYPE_WORD):
                 if loose_expression_group is None:
-                    loose_expression_group = Group()
+                    loose_expression_group = _GroupBuilder()
                     groups.append(loose_expression_group)
                 self._parse_expression(loose_expression_group)
                 
@@ -249,10 +248,10 @@ class Parser(object):
         for group in groups:
             self._add_defaults(group)
         
-        return groups
+        return [group.build() for group in groups]
 
     def _parse_group(self):
-        group = Group()
+        group = _GroupBuilder()
         self._expect(token.TYPE_OPEN_CURLY)
         
         # validate that at least one expression is found inside the group
@@ -291,54 +290,65 @@ class Parser(object):
     def _parse_argument(self, expression_type):
         first_token_index = self._get_current_index()
         
-        arg = Argument()
+        is_exclusion = False
+        is_wildcard = False
+        start = end = None
+        is_half_open = False
+        interval = None
         
         if self._optional(token.TYPE_NOT):
-            arg.is_exclusion = True
+            is_exclusion = True
         
         if self._optional(token.TYPE_WILDCARD):
-            arg.is_wildcard = True
+            is_wildcard = True
         else:
-            self._parse_range(expression_type, arg)
+            start, end, is_half_open = self._parse_range(expression_type)
         
         if self._optional(token.TYPE_INTERVAL):
             tok = self._expect(token.TYPE_INTEGER)
-            arg.interval = int(tok.string)
-            if arg.interval <= 0:
-                raise SchyntaxParseException('"%d" is not a valid interval' % arg.interval, self._input, tok.index)
+            interval = int(tok.string)
+            if interval <= 0:
+                raise SchyntaxParseException('"%d" is not a valid interval' % interval, self._input, tok.index)
         
-        if arg.is_wildcard and arg.is_exclusion and arg.interval is None:
+        if is_wildcard and is_exclusion and interval is None:
             raise SchyntaxParseException("Wildcards can't be excluded with the ! operator, except when part of an interval (using %)", self._input, first_token_index)
         
-        return arg
+        return Argument(is_exclusion, is_wildcard, start, end, is_half_open, interval)
     
-    def _parse_range(self, expression_type, arg):
+    def _parse_range(self, expression_type):
+        '''
+        Returns a (start, end, is_half_open) tuple. end is None if no range is given.
+        '''
         first_token_index = self._get_current_index()
         
-        arg.start = self._parse_range_value(expression_type)
+        start = self._parse_range_value(expression_type)
+        end = None
+        is_half_open = False
         
         is_range = False
         if self._optional(token.TYPE_RANGE_INCLUSIVE):
             is_range = True
         elif self._optional(token.TYPE_RANGE_HALF_OPEN):
             is_range = True
-            arg.is_half_open = True
+            is_half_open = True
         
         if is_range:
-            arg.end = self._parse_range_value(expression_type)
+            end = self._parse_range_value(expression_type)
         
-        if arg.is_half_open and arg.start == arg.end:
+        if is_half_open and start == end:
             raise SchyntaxParseException("Start and end values of a half-open range cannot be equal.", self._input, first_token_index)
         
-        if expression_type == EXPRESSION_TYPE_DATES and arg.end is not None:
+        if expression_type == EXPRESSION_TYPE_DATES and end is not None:
             # special validation to make the date range is sane
-            if arg.start.year is not None or arg.end.year is not None:
-                if arg.start.year is None or arg.end.year is None:
+            if start.year is not None or end.year is not None:
+                if start.year is None or end.year is None:
                     raise SchyntaxParseException("Cannot mix full and partial dates in a date range.", self._input, first_token_index)
                 
-                if arg.start > arg.end:
+                if start > end:
                     raise SchyntaxParseException("End date of range is before the start date.", self._input, first_token_index)
         
+        return start, end, is_half_open
+        
     def _parse_range_value(self, expression_type):
         if expression_type == EXPRESSION_TYPE_DATES:
             return self._parse_date()
@@ -553,7 +563,8 @@ class Parser(object):
         if argument.end is not None:
             effective_end = argument.end
         elif has_interval_specified:
-            effective_end = DateValue(None, 12, 31)
+            # the end of the year, which must have a year of its own if the start does
+            effective_end = DateValue(argument.start.year, 12, 31)
         else:
             effective_end = argument.start
         
@@ -0,0 +1,76 @@
+from schyntax.internals.dateutil import EPOCH_ORDINAL, get_day_of_week, get_epoch_seconds_from_ordinal
+
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+
+class Period(object):
+    '''
+    The events of compiled groups without date or day-of-month rules, which
+    repeat every week. The nearest event is found straight from the masks
+    of each group with a few bit scans, no table of events is built.
+    '''
+    def __init__(self, groups):
+        self.groups = groups
+
+    def next(self, ts):
+        '''
+        Returns the first event strictly after ts, in epoch seconds.
+        '''
+        ts += 1
+        hour, minute = divmod(ts % DAY // MINUTE, 60)
+
+        best = None
+        for compiled in self.groups:
+            event = _find_event(compiled, ts // DAY, hour, minute, ts % MINUTE, True)
+            if best is None or event < best:
+                best = event
+        return best
+
+    def previous(self, ts):
+        '''
+        Returns the last event at or before ts, in epoch seconds.
+        '''
+        hour, minute = divmod(ts % DAY // MINUTE, 60)
+
+        best = None
+        for compiled in self.groups:
+            event = _find_event(compiled, ts // DAY, hour, minute, ts % MINUTE, False)
+            if best is None or event > best:
+                best = event
+        return best
+
+
+def _find_event(compiled, day, hour, minute, second, is_after):
+    '''
+    Returns the first event of the group from the given time of the given
+    day (counted from the epoch) in the search direction, in epoch seconds.
+    '''
+    inc = 1 if is_after else -1
+
+    # groups which can match have a time on every valid day of the week, so
+    # this ends within eight days
+    while True:
+        if compiled.days_of_week_mask >> get_day_of_week(day + EPOCH_ORDINAL) & 1:
+            time = compiled.find_time(hour, minute, second, is_after)
+            if time is not None:
+                return get_epoch_seconds_from_ordinal(day + EPOCH_ORDINAL, *time)
+
+        day += inc
+        if is_after:
+            hour, minute, second = 0, 0, 0
+        else:
+            hour, minute, second = 23, 59, 59
+
+
+def detect_period(groups):
+    '''
+    Returns a Period for the compiled groups if their events repeat every
+    week, or None if the general search is needed because a group has date
+    or day-of-month rules.
+    '''
+    if not groups or any(compiled.has_day_rules for compiled in groups):
+        return None
+    return Period(groups)
@@ -1,4 +1,5 @@
 import re
+from collections import namedtuple
 
 
 class TokenType(object):
@@ -17,15 +18,10 @@ class TokenType(object):
         self.name = name
 
 
-class Token(object):
-    type = None         # TYPE_XXX enum
-    string = None       # raw token string from input
-    index = None
-    
-    def __init__(self, type, string, index):
-        self.type = type
-        self.string = string
-        self.index = index
+class Token(namedtuple('Token', 'type string index')):
+    # type is a TYPE_XXX enum
+    # string is the raw token string from input
+    __slots__ = ()
 
 
 #########################
@@ -0,0 +1,187 @@
+'''
+NumPy implementations of Schedule.matches_many() and Schedule.next_many().
+
+Timestamps are split into day ordinals and times of day with array
+arithmetic, and the compiled masks and year bitmaps of each group are
+turned into lookup tables, so there is no Python-level loop per element.
+This module requires NumPy, and is only imported when those methods are
+called.
+'''
+import numpy
+
+from schyntax.internals.bitutil import iter_bits
+from schyntax.internals.dateutil import EPOCH_ORDINAL, get_year_start_ordinal, get_day_of_week, \
+    get_epoch_seconds_from_ordinal
+
+
+# integer value of NaT, also used as the "not found" marker for integer results
+NOT_FOUND = numpy.iinfo(numpy.int64).min
+
+_MAX = numpy.iinfo(numpy.int64).max
+
+
+def to_epoch_seconds(values):
+    '''
+    Returns (seconds, is_datetime) for an array of datetime64 values (of any
+    unit) or of integer seconds since the unix epoch. Fractions of a second
+    are dropped.
+    '''
+    values = numpy.asarray(values)
+    if values.dtype.kind == 'M':
+        return values.astype('datetime64[s]').astype(numpy.int64), True
+    if values.dtype.kind == 'f':
+        return numpy.floor(values).astype(numpy.int64), False
+    return values.astype(numpy.int64), False
+
+
+def _lookup_table(mask, size):
+    table = numpy.zeros(size, dtype=bool)
+    table[list(iter_bits(mask))] = True
+    return table
+
+
+def _get_years(ordinals):
+    # civil_from_days, as in dateutil.get_date_from_ordinal, on whole arrays
+    z = ordinals - EPOCH_ORDINAL + 719468
+    era = z // 146097
+    day_of_era = z - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    mp = (5 * day_of_year + 2) // 153
+    return year_of_era + era * 400 + (mp >= 10)
+
+
+def _year_table(group, years):
+    '''
+    Returns a (len(years), 366) boolean array of valid days, one row per year.
+    '''
+    table = numpy.zeros((len(years), 366), dtype=bool)
+    for row, year in enumerate(years):
+        days = group.days_in_year(int(year))
+        # big-endian bytes of the 368-bit bitmap, unpacked most significant
+        # bit first, so reversed they are in day-of-year order
+        bits = numpy.frombuffer(bytes(bytearray.fromhex('%092x' % days)), dtype=numpy.uint8)
+        table[row] = numpy.unpackbits(bits)[::-1][:366].astype(bool)
+    return table
+
+
+def _valid_days(group, ordinals):
+    '''
+    Returns a boolean array telling which of the day ordinals are valid days
+    for the group.
+    '''
+    if not group.has_day_rules:
+        return _lookup_table(group.days_of_week_mask, 8)[get_day_of_week(ordinals)]
+
+    years = _get_years(ordinals)
+    unique_years, rows = numpy.unique(years, return_inverse=True)
+    year_starts = numpy.array([get_year_start_ordinal(int(year)) for year in unique_years], dtype=numpy.int64)
+
+    table = _year_table(group, unique_years)
+    return table[rows.reshape(ordinals.shape), ordinals - year_starts[rows].reshape(ordinals.shape)]
+
+
+def _valid_day_list(group, first, last):
+    '''
+    Returns the sorted ordinals of all valid days from first to last.
+    '''
+    if not group.has_day_rules:
+        ordinals = numpy.arange(first, last + 1, dtype=numpy.int64)
+        return ordinals[_lookup_table(group.days_of_week_mask, 8)[get_day_of_week(ordinals)]]
+
+    first_year, last_year = _get_years(numpy.array([first, last], dtype=numpy.int64))
+    years = numpy.arange(first_year, last_year + 1)
+    table = _year_table(group, years)
+
+    chunks = []
+    for row, year in enumerate(years):
+        chunks.append(numpy.nonzero(table[row])[0] + get_year_start_ordinal(int(year)))
+    ordinals = numpy.concatenate(chunks)
+    return ordinals[(ordinals >= first) & (ordinals <= last)]
+
+
+def _times_of_day(group):
+    '''
+    Returns the sorted seconds since midnight at which the group has events.
+    '''
+    hours = _lookup_table(group.hours_mask, 24)
+    minutes = _lookup_table(group.minutes_mask, 60)
+    seconds = _lookup_table(group.seconds_mask, 60)
+
+    valid = hours[:, None, None] & minutes[None, :, None] & seconds[None, None, :]
+    return numpy.flatnonzero(valid.ravel())
+
+
+def _mask_missing(seconds):
+    '''
+    Returns (seconds, missing), where missing tells which elements are NaT
+    (or its integer value). Those are replaced by the epoch, so they don't
+    drag far-off years into the search, and their results are overwritten.
+    '''
+    missing = seconds == NOT_FOUND
+    if missing.any():
+        seconds = numpy.where(missing, 0, seconds)
+    return seconds, missing
+
+
+def matches_many(groups, seconds):
+    seconds, missing = _mask_missing(seconds)
+    ordinals = seconds // 86400 + EPOCH_ORDINAL
+    time_of_day = seconds % 86400
+
+    result = numpy.zeros(seconds.shape, dtype=bool)
+    for group in groups:
+        times = numpy.zeros(86400, dtype=bool)
+        times[_times_of_day(group)] = True
+
+        matched = times[time_of_day]
+        if matched.any():
+            matched &= _valid_days(group, ordinals)
+        result |= matched
+
+    result[missing] = False
+    return result
+
+
+def next_many(groups, seconds, search_days):
+    seconds, missing = _mask_missing(seconds)
+
+    # "'after' events must be in the future"
+    start = seconds + 1
+    start_ordinals = start // 86400 + EPOCH_ORDINAL
+    start_times = start % 86400
+
+    # last day searched, as in Schedule._iter_events
+    limits = numpy.maximum(seconds // 86400 + EPOCH_ORDINAL + search_days - 1, start_ordinals)
+
+    result = numpy.full(seconds.shape, _MAX, dtype=numpy.int64)
+    if not seconds.size:
+        return result
+
+    for group in groups:
+        times = _times_of_day(group)
+
+        # a later event on the start day itself
+        index = numpy.searchsorted(times, start_times)
+        same_day = index < len(times)
+        same_day[same_day] &= _valid_days(group, start_ordinals[same_day])
+
+        candidate = numpy.full(seconds.shape, _MAX, dtype=numpy.int64)
+        candidate[same_day] = get_epoch_seconds_from_ordinal(start_ordinals[same_day], second=times[index[same_day]])
+
+        # otherwise the first event of the next valid day
+        other = ~same_day
+        if other.any():
+            valid_days = _valid_day_list(group, int(start_ordinals[other].min()) + 1, int(limits[other].max()))
+            if len(valid_days):
+                index = numpy.searchsorted(valid_days, start_ordinals[other] + 1)
+                found = index < len(valid_days)
+                days = valid_days[numpy.minimum(index, len(valid_days) - 1)]
+                found &= days <= limits[other]
+
+                candidate[other] = numpy.where(found, get_epoch_seconds_from_ordinal(days, second=times[0]), _MAX)
+
+        numpy.minimum(result, candidate, out=result)
+
+    result[(result == _MAX) | missing] = NOT_FOUND
+    return result
@@ -1,286 +1,336 @@
 import datetime
+import time
+from array import array
 
-from schyntax.internals.parser import parse
-from schyntax.internals.dateutil import get_days_in_month, get_days_in_previous_month
+from schyntax.internals.compiler import compile_schedule, parse_cache
+from schyntax.internals.cursor import GroupCursor
+from schyntax.internals.counting import count_events
+from schyntax.internals.dateutil import EPOCH_ORDINAL, get_epoch_seconds, get_epoch_seconds_from_ordinal, get_epoch_window, \
+    get_date_from_ordinal
 from schyntax.exceptions import ValidTimeNotFoundException
 
 
-__all__ = ['Schedule']
+__all__ = ['Schedule', 'set_parse_cache_size', 'get_parse_cache_info', 'clear_parse_cache']
 
 
-# (tweak the parameter footprint... this is gross)
-# This is not very pleasant, but it lets the loops for hour, minute, second
-# work more like the original C# code, which has a for loop construct
-# that python just doesn't support.
-#
-# Yields tuples in this pattern:
-#   (start, initial_extras ...)
-#   (start + 1, further_extras ...)
-#   (start + 2, further_extras ...)
-#   ...
-def _loop_helper(start, count, inc, initial_extras, further_extras):
-    if count <= 0:
-        return
-    
-    primary = start
-    
-    # first yield start and the values supplied in initial_extras.
-    yield (primary,) + initial_extras
-    
-    # for the rest, increment primary and yield it with the 
-    # other values supplied in further_extras.
-    for i in range(count - 1):
-        primary += inc
-        yield (primary,) + further_extras
+# Typecode of the 64-bit integer arrays returned by between(). Python 2 has
+# no 'q', but its 'l' is 64 bits wide on 64-bit Linux and macOS.
+try:
+    array('q')
+    EPOCH_TYPECODE = 'q'
+except ValueError:
+    EPOCH_TYPECODE = 'l'
+
+
+# Number of days searched for an event by default, counting the day of the
+# reference time. This matches the reference implementation.
+DEFAULT_SEARCH_DAYS = 367
+
+
+def set_parse_cache_size(maxsize):
+    '''
+    Sets how many distinct schedule strings keep their parsed form cached.
+    Zero disables the cache. Raises ValueError for anything but a
+    non-negative integer.
+    '''
+    parse_cache.resize(maxsize)
+
+
+def get_parse_cache_info():
+    '''
+    Returns a (hits, misses, maxsize, currsize) named tuple for the cache.
+    '''
+    return parse_cache.info()
+
+
+def clear_parse_cache():
+    parse_cache.clear()
+
+
+def _get_time_of_day(dt):
+    '''
+    Returns the whole seconds since midnight of a datetime.
+    '''
+    return dt.hour * 3600 + dt.minute * 60 + dt.second
+
+
+def _split_epoch_seconds(ts):
+    '''
+    Returns an (ordinal, hour, minute, second) tuple for epoch seconds.
+    '''
+    hour, minute = divmod(ts % 86400 // 60, 60)
+    return ts // 86400 + EPOCH_ORDINAL, hour, minute, ts % 60
 
 
 class Schedule(object):
-    def __init__(self, string):
+    def __init__(self, string, search_days=DEFAULT_SEARCH_DAYS):
+        '''
+        search_days is how many days, starting with the day of the reference
+        time, are searched for an event before giving up. Each call can
+        override it.
+        '''
+        if search_days < 1:
+            raise ValueError("search_days must be at least 1")
+        
         self.original_text = string
+        self.search_days = search_days
         # FIXME - validate here or inside parser?
-        self._groups = parse(string)
+        # the period is shared along with the groups, and is None when the
+        # schedule needs the general search
+        self._groups, self._period = compile_schedule(string)
     
-    def next(self, after=None):
+    def next(self, after=None, search_days=None):
         if after is None:
             after = datetime.datetime.utcnow()
-        return self._get_event(after, True)
+        return self._get_event(after, True, search_days)
 
-    def previous(self, at_or_before=None):
+    def previous(self, at_or_before=None, search_days=None):
         if at_or_before is None:
             at_or_before = datetime.datetime.utcnow()
-        return self._get_event(at_or_before, False)
+        return self._get_event(at_or_before, False, search_days)
     
-    def _get_event(self, ref, is_after):
-        # FIXME - ensure or convert given time to UTC?
-        result = None
+    def matches(self, dt):
+        '''
+        Returns True if the schedule has an event at the given time, without
+        searching. Any fraction of a second is ignored.
+        '''
+        ordinal = dt.toordinal()
+        hour, minute, second = dt.hour, dt.minute, dt.second
+        
         for group in self._groups:
-            e = self._try_get_group_event(group, ref, is_after)
-            if e is not None:
-                if result is None or (is_after and e < result) or (not is_after and e > result):
-                    result = e
-        if result is None:
-            raise ValidTimeNotFoundException()
-        return result
+            if group.matches(ordinal, hour, minute, second):
+                return True
+        return False
     
-    def _try_get_group_event(self, group, ref, is_after):
-        inc = 1 if is_after else -1
-        
-        init_hour = 0 if is_after else 23
-        init_minute = 0 if is_after else 59
-        init_second = 0 if is_after else 59
+    def iter_next(self, after=None, search_days=None):
+        '''
+        Generator yielding every event after the given time (or now) in
+        ascending order. Equivalent to calling next() repeatedly with the
+        previous result, but the search resumes where it left off.
+        '''
+        if after is None:
+            after = datetime.datetime.utcnow()
+        for event in self._iter_events(after.toordinal(), _get_time_of_day(after), True, search_days=search_days):
+            yield self._to_datetime(event)
+    
+    def iter_previous(self, at_or_before=None, search_days=None):
+        '''
+        Generator yielding every event at or before the given time (or now)
+        in descending order, without repeating the event at the cursor.
+        '''
+        if at_or_before is None:
+            at_or_before = datetime.datetime.utcnow()
+        for event in self._iter_events(at_or_before.toordinal(), _get_time_of_day(at_or_before), False, search_days=search_days):
+            yield self._to_datetime(event)
+    
+    def between(self, start, end, as_numpy=False):
+        '''
+        Returns every event in the half-open window [start, end) as integer
+        seconds since the unix epoch, in ascending order, packed into an
+        array('q') (array('l') on Python 2). With as_numpy=True the result
+        is returned as a NumPy datetime64[s] array instead (this requires
+        NumPy to be installed).
         
-        # TODO - optimize some cases like "seconds(5, !5)".
-        #        if there are no day-level includes or excludes, then if they do not 
-        #        match in the first 24 hour period, they cannot match anything.
-        #        So check all 6 day-level lists and set the loop range below to 2?
-        #        Check logic on the hypothesis further before implementing.
+        Unlike next(), the search is not limited to a year past each event,
+        it always covers the whole window.
+        '''
+        if as_numpy:
+            import numpy
         
-        # "todo: make the length of the search configurable"
-        for d in range(367):
-            if d == 0:
-                # "'after' events must be in the future"
-                date = ref
-                if is_after:
-                    date = date + datetime.timedelta(seconds=1)
-                
-                hour = date.hour
-                minute = date.minute
-                second = date.second
-            else:
-                date = ref + datetime.timedelta(days=d * inc)
-                
-                hour = init_hour
-                minute = init_minute
-                second = init_second
-            
-            year = date.year
-            month = date.month
-            day_of_week = date.isoweekday() % 7 + 1  # convert py's isoweekday to sun=1 .. sat=7
-            day_of_month = date.day
-            
-            
-            # "check if today is an applicable date"
-            if group.dates and not self._in_date_rule(group.dates, year, month, day_of_month):
-                continue
-                
-            if group.dates_excluded and self._in_date_rule(group.dates_excluded, year, month, day_of_month):
-                continue
-            
-            
-            # "check if date is an applicable day of month"
-            if group.days_of_month and not self._in_dom_rule(group.days_of_month, year, month, day_of_month):
-                continue
-            
-            if group.days_of_month_excluded and self._in_dom_rule(group.days_of_month_excluded, year, month, day_of_month):
-                continue
-            
-            
-            # "check if date is an applicable day of week"
-            if group.days_of_week and not self._in_rule(7, group.days_of_week, day_of_week):
-                continue
-                
-            if group.days_of_week_excluded and self._in_rule(7, group.days_of_week_excluded, day_of_week):
-                continue
+        result = array(EPOCH_TYPECODE)
+        first, stop = get_epoch_window(start, end)
+        if first < stop:
+            # events are searched strictly after ref, which is one second before the window
+            ref = first - 1
+            end_ordinal = (stop - 1) // 86400 + EPOCH_ORDINAL
             
-            
-            # "if we've gotten this far, then today is an applicable day, let's keep going with hour checks"
-            hour_count = 24 - hour if is_after else hour + 1
-            for hour, minute, second in _loop_helper(hour, hour_count, inc, (minute, second), (init_minute, init_second)):
-                
-                if group.hours and not self._in_rule(24, group.hours, hour):
-                    continue
-                
-                if group.hours_excluded and self._in_rule(24, group.hours_excluded, hour):
-                    continue
-                
-                # "if we've gotten here, the date and hour are valid. Let's check for minutes"
-                minute_count = 60 - minute if is_after else minute + 1
-                for minute, second in _loop_helper(minute, minute_count, inc, (second,), (init_second,)):
-                    
-                    if group.minutes and not self._in_rule(60, group.minutes, minute):
-                        continue
-                    
-                    if group.minutes_excluded and self._in_rule(60, group.minutes_excluded, minute):
-                        continue
-                        
-                    # "check for valid seconds"
-                    second_count = 60 - second if is_after else second + 1
-                    for second, in _loop_helper(second, second_count, inc, (), ()):
-                        
-                        if group.seconds and not self._in_rule(60, group.seconds, second):
-                            continue
-                        
-                        if group.seconds_excluded and self._in_rule(60, group.seconds_excluded, second):
-                            continue
-                        
-                        # "we've found our event"
-                        # TODO - explicitly set UTC?
-                        return datetime.datetime(year, month, day_of_month, hour, minute, second)
+            for ordinal, hour, minute, second in self._iter_events(ref // 86400 + EPOCH_ORDINAL, ref % 86400, True, end_ordinal):
+                t = get_epoch_seconds_from_ordinal(ordinal, hour, minute, second)
+                if t >= stop:
+                    break
+                result.append(t)
         
-        # "we didn't find an applicable date"
-        return None
+        if as_numpy:
+            return numpy.frombuffer(result, dtype=numpy.int64).view('datetime64[s]')
+        return result
     
-    def _in_date_rule(self, ranges, year, month, day_of_month):
-        for rng in ranges:
-            if self._in_date_range(rng, year, month, day_of_month):
-                return True
-        return False
+    def count(self, start, end):
+        '''
+        Returns the number of events in the half-open window [start, end),
+        the same as len(between(start, end)), without enumerating them.
+        '''
+        first, stop = get_epoch_window(start, end)
+        return count_events(self._groups, first, stop)
     
-    def _in_dom_rule(self, ranges, year, month, day_of_month):
-        for rng in ranges:
-            if self._in_dom_range(rng, year, month, day_of_month):
-                return True
-        return False
+    def matches_many(self, times):
+        '''
+        Vectorized matches() for a NumPy array of datetime64 values, or of
+        integer seconds since the unix epoch. Returns a boolean array of the
+        same shape, which is False for NaT. This requires NumPy to be
+        installed.
+        '''
+        from schyntax.internals import vectorized
     
-    def _in_rule(self, length_of_unit, ranges, value):
-        for rng in ranges:
-            if self._in_integer_range(rng, value, length_of_unit):
-                return True
-        return False
+        seconds, _ = vectorized.to_epoch_seconds(times)
+        return vectorized.matches_many(self._groups, seconds)
     
+    def next_many(self, times, search_days=None):
+        '''
+        Vectorized next() for a NumPy array of datetime64 values, or of
+        integer seconds since the unix epoch. Returns an array of the same
+        shape, as datetime64[s] or int64 seconds to match the input. Where no
+        event is found, or the input is NaT, the result is NaT, or its
+        integer value for int64 results. This requires NumPy to be installed.
+        '''
+        from schyntax.internals import vectorized
     
-    def _in_date_range(self, rng, year, month, day_of_month):
-        if rng.is_half_open:
-            if rng.end.day == day_of_month and rng.end.month == month and (rng.end.year is None or rng.end.year == year):
-                return False
-        
-        # check if in between start and end dates
-        if rng.start.year is not None:
-            # absolute dates with years. both will have years or neither will.
-            
-            if year < rng.start.year or year > rng.end.year:
-                return False
-            
-            if year == rng.start.year and self._compare_month_and_day(month, day_of_month, rng.start.month, rng.start.day) < 0:
-                return False
-            
-            if year == rng.end.year and self._compare_month_and_day(month, day_of_month, rng.end.month, rng.end.day) > 0:
-                return False
+        search_days = self._get_search_days(search_days)
+        seconds, is_datetime = vectorized.to_epoch_seconds(times)
+        result = vectorized.next_many(self._groups, seconds, search_days)
+        if is_datetime:
+            return result.view('datetime64[s]')
+        return result
+    
+    def next_epoch(self, ts=None, search_days=None):
+        '''
+        Same as next(), but takes and returns integer seconds since the unix
+        epoch. No datetime objects are created along the way.
+        '''
+        if ts is None:
+            ts = int(time.time())
+        return self._get_epoch_event(ts, True, search_days)
+    
+    def previous_epoch(self, ts=None, search_days=None):
+        '''
+        Same as previous(), but takes and returns integer seconds since the
+        unix epoch.
+        '''
+        if ts is None:
+            ts = int(time.time())
+        return self._get_epoch_event(ts, False, search_days)
+    
+    def _get_event(self, ref, is_after, search_days=None):
+        # FIXME - ensure or convert given time to UTC?
+        if self._period is not None:
+            ts = get_epoch_seconds(ref)
+            return self._to_datetime(_split_epoch_seconds(self._get_periodic_event(ts, is_after, search_days)))
         
-        elif rng.start > rng.end:
-            # split range
-            # "split ranges aren't allowed to have years (it wouldn't make any sense)"
-            
-            if month == rng.start.month or month == rng.end.month:
-                if month == rng.start.month and day_of_month < rng.start.day:
-                    return False
-                
-                if month == rng.end.month and day_of_month > rng.end.day:
-                    return False
-                
-            elif not (month < rng.end.month or month > rng.start.month):
-                return False
-            
-        else:
-            # "not a split range, and no year information - just month and day to go on"
-            if self._compare_month_and_day(month, day_of_month, rng.start.month, rng.start.day) < 0:
-                return False
-            if self._compare_month_and_day(month, day_of_month, rng.end.month, rng.end.day) > 0:
-                return False
+        for event in self._iter_events(ref.toordinal(), _get_time_of_day(ref), is_after, search_days=search_days):
+            return self._to_datetime(event)
+        raise ValidTimeNotFoundException()
+    
+    def _get_epoch_event(self, ts, is_after, search_days=None):
+        # floor, in case of a float
+        ts = int(ts // 1)
+        if self._period is not None:
+            return self._get_periodic_event(ts, is_after, search_days)
         
-        # If we get here, then we're definitely somewhere within the range.
-        # If there's no interval, then there's nothing else we need to check
-        if rng.interval == 1:  # I just made nonspecified intervals unify to a 1
-            return True
+        for ordinal, hour, minute, second in self._iter_events(ts // 86400 + EPOCH_ORDINAL, ts % 86400, is_after, search_days=search_days):
+            return get_epoch_seconds_from_ordinal(ordinal, hour, minute, second)
+        raise ValidTimeNotFoundException()
+    
+    def _get_periodic_event(self, ts, is_after, search_days=None):
+        '''
+        Closed-form version of _get_event() for periodic schedules, in epoch
+        seconds. The nearest event is computed directly, then checked against
+        the same search window _iter_events() uses.
+        '''
+        span = self._get_search_days(search_days) - 1
+        ref_day = ts // 86400
         
-        # "figure out the actual date of the low date so we know whether we're on the desired interval"
-        if rng.start.year is not None:
-            start_year = rng.start.year
-        elif rng.start > rng.end and month <= rng.end.month:
-            # "start date is from the previous year"
-            start_year = year - 1
+        if is_after:
+            event = self._period.next(ts)
+            if event // 86400 > max(ref_day + span, (ts + 1) // 86400):
+                raise ValidTimeNotFoundException()
         else:
-            start_year = year
+            event = self._period.previous(ts)
+            if event // 86400 < ref_day - span:
+                raise ValidTimeNotFoundException()
+        return event
+    
+    def _get_search_days(self, search_days):
+        if search_days is None:
+            return self.search_days
+        if search_days < 1:
+            raise ValueError("search_days must be at least 1")
+        return search_days
+    
+    def _to_datetime(self, event):
+        ordinal, hour, minute, second = event
+        # TODO - explicitly set UTC?
+        return datetime.datetime(*(get_date_from_ordinal(ordinal) + (hour, minute, second)))
+    
+    def _iter_events(self, ref_ordinal, ref_time, is_after, end_ordinal=None, search_days=None):
+        '''
+        Yields (ordinal, hour, minute, second) tuples for the events of all
+        groups, merged in search order. The reference time is given as the
+        ordinal of its day and the whole seconds since midnight.
         
-        start_day = rng.start.day
+        If end_ordinal is given, the search covers every day up to and
+        including it. Otherwise it stops once search_days days pass without
+        an event.
+        '''
+        inc = 1 if is_after else -1
+        span = (self._get_search_days(search_days) - 1) * inc
         
-        # "check if start date was actually supposed to be February 29th, but isn't because of non-leap-year."
-        if rng.start.month == 2 and rng.start.day == 29 and get_days_in_month(start_year, 2) != 29:
-            # "bump the start day back to February 28th so that interval schemes work based on that imaginary date"
-            # "but seriously, people should probably just expect weird results if they're doing something that stupid."
-            start_day = 28
+        # "'after' events must be in the future"
+        start_ordinal = ref_ordinal
+        start_time = ref_time
+        if is_after:
+            start_time += 1
+            if start_time == 86400:
+                start_ordinal += 1
+                start_time = 0
         
-        start = datetime.date(start_year, rng.start.month, start_day)
-        current = datetime.date(year, month, day_of_month)
-        day_count = (current - start).days
+        hour, minute = divmod(start_time // 60, 60)
+        second = start_time % 60
         
-        return day_count % rng.interval == 0
+        cursors = [GroupCursor(group, start_ordinal, hour, minute, second, is_after) for group in self._groups]
+        heads = [None] * len(cursors)
         
-    def _compare_month_and_day(self, m1, d1, m2, d2):
-        if m1 < m2 or (m1 == m2 and d1 < d2):
-            return -1
-        if m2 < m1 or (m2 == m1 and d2 < d1):
-            return 1
-        return 0
-    
-    def _in_dom_range(self, rng, year, month, day_of_month):
-        # if either range value is negative, convert to positive by counting back from end of the month
-        if rng.start < 0 or rng.end < 0:
-            days_in_month = get_days_in_month(year, month)
+        if end_ordinal is not None:
+            limit = end_ordinal
+        else:
+            # the day after ref is searched as well when ref is its last second
+            limit = max(ref_ordinal + span, start_ordinal) if is_after else ref_ordinal + span
+        
+        while True:
+            best = None
+            for head in heads:
+                if head is not None and (best is None or (head < best if is_after else head > best)):
+                    best = head
             
-            rng = rng.clone()
+            # The groups share one sweep over the days: once any group has an
+            # event on some day, the others only need to search up to that
+            # day. A cursor which finds nothing stays parked just past it.
+            for i, cursor in enumerate(cursors):
+                if heads[i] is None:
+                    head = cursor.advance(limit if best is None else best[0])
+                    heads[i] = head
+                    
+                    if head is not None and (best is None or (head < best if is_after else head > best)):
+                        best = head
             
-            if rng.start < 0:
-                rng.start = days_in_month + rng.start + 1
-            if rng.end < 0:
-                rng.end = days_in_month + rng.end + 1
-        
-        return self._in_integer_range(rng, day_of_month, get_days_in_previous_month(year, month))
-
-    def _in_integer_range(self, rng, value, length_of_unit):
-        
-        if rng.is_half_open and value == rng.end:
-            return False
-        
-        # simple case where start <= end
-        if rng.start <= value <= rng.end:
-            return (value - rng.start) % rng.interval == 0
-        
-        # split case where start > end
-        if rng.start > rng.end and (value <= rng.end or value >= rng.start):
-            if value >= rng.start:
-                return (value - rng.start) % rng.interval == 0
+            if best is None:
+                # "we didn't find an applicable date"
+                return
             
-            return (value + length_of_unit - rng.start) % rng.interval == 0
-        
-        return False
+            yield best
+            
+            # several groups may produce the same event, only report it once
+            for i, head in enumerate(heads):
+                if head == best:
+                    heads[i] = None
+            
+            if end_ordinal is not None:
+                continue
+            
+            # the search window restarts from each event, just like calling
+            # next(event), or previous() with a time just before the event.
+            ordinal, hour, minute, second = best
+            if is_after:
+                limit = ordinal + max(span, hour == 23 and minute == 59 and second == 59)
+            else:
+                if hour == minute == second == 0:
+                    ordinal -= 1
+                limit = ordinal + span
@@ -0,0 +1,233 @@
+import datetime
+import heapq
+import itertools
+
+from schyntax.internals.bitutil import iter_bits
+from schyntax.internals.dateutil import get_day_of_week
+from schyntax.exceptions import ValidTimeNotFoundException
+
+
+__all__ = ['ScheduleSet']
+
+
+# placeholder key for heap entries which have been removed or replaced
+_REMOVED = object()
+
+
+class ScheduleSet(object):
+    '''
+    Collection of keyed Schedule instances which keeps the next event of
+    every member in a priority queue, so the earliest upcoming event across
+    all members is found without asking each one.
+
+    Every group of every member also gets a slot number in an inverted
+    index, which maps each second, minute, hour and day of week to a bitset
+    of the slots allowing that value. due_at() intersects those bitsets
+    instead of testing each member.
+    '''
+    def __init__(self):
+        self._schedules = {}
+        self._entries = {}      # key -> heap entry, for members with an upcoming event
+        self._heap = []
+        self._counter = itertools.count()
+
+        self._slots = []        # slot -> (key, CompiledGroup), or None if free
+        self._free_slots = []
+        self._key_slots = {}    # key -> list of slots
+
+        self._second_index = [0] * 60
+        self._minute_index = [0] * 60
+        self._hour_index = [0] * 24
+        self._day_of_week_index = [0] * 8   # sun=1 .. sat=7
+        self._day_rule_slots = 0            # slots which also need the day-level rules checked
+
+    def __len__(self):
+        return len(self._schedules)
+
+    def __contains__(self, key):
+        return key in self._schedules
+
+    def __iter__(self):
+        return iter(self._schedules)
+
+    def get(self, key, default=None):
+        return self._schedules.get(key, default)
+
+    def add(self, key, schedule, after=None):
+        '''
+        Adds a schedule under the given key, replacing any schedule already
+        stored with that key. Its first event is the next one after `after`,
+        or after the current time if not given.
+
+        A schedule with no upcoming event is kept as a member, but never
+        becomes due.
+        '''
+        if after is None:
+            after = datetime.datetime.utcnow()
+
+        self.remove(key)
+        self._schedules[key] = schedule
+        self._index(key, schedule)
+        self._push(key, schedule, after)
+
+    def remove(self, key):
+        '''
+        Removes the schedule with the given key, if there is one.
+        '''
+        self._schedules.pop(key, None)
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[-1] = _REMOVED
+
+        for slot in self._key_slots.pop(key, ()):
+            self._unindex(slot)
+
+    def peek(self):
+        '''
+        Returns a (time, key) tuple for the earliest upcoming event across
+        all members, or None if no member has an upcoming event.
+        '''
+        heap = self._heap
+        while heap and heap[0][-1] is _REMOVED:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+
+        time, _, key = heap[0]
+        return time, key
+
+    def pop_due(self, now=None):
+        '''
+        Returns a list of (time, key) tuples, in time order, for every event
+        at or before `now` (or the current time). Each member that fired is
+        moved on to its next event after the one reported, so a member which
+        missed several events reports each of them.
+        '''
+        if now is None:
+            now = datetime.datetime.utcnow()
+
+        due = []
+        heap = self._heap
+        while heap:
+            time, _, key = heap[0]
+            if key is _REMOVED:
+                heapq.heappop(heap)
+                continue
+
+            if time > now:
+                break
+
+            heapq.heappop(heap)
+            del self._entries[key]
+            due.append((time, key))
+
+            # only the member which fired needs a new event
+            self._push(key, self._schedules[key], time)
+
+        return due
+
+    def pop_latest_due(self, now=None):
+        '''
+        Like pop_due(), but reports only the latest event at or before `now`
+        of each member that fired, in time order. Members move straight on
+        to their next event after `now`, so the cost doesn't grow with the
+        number of events they missed.
+        '''
+        if now is None:
+            now = datetime.datetime.utcnow()
+
+        due = []
+        heap = self._heap
+        while heap:
+            time, _, key = heap[0]
+            if key is _REMOVED:
+                heapq.heappop(heap)
+                continue
+
+            if time > now:
+                break
+
+            heapq.heappop(heap)
+            del self._entries[key]
+
+            schedule = self._schedules[key]
+            try:
+                time = schedule.previous(now)
+            except ValidTimeNotFoundException:
+                # the due event lies further back than previous() searches
+                pass
+            due.append((time, key))
+
+            self._push(key, schedule, now)
+
+        due.sort(key=lambda item: item[0])
+        return due
+
+    def due_at(self, dt):
+        '''
+        Returns a list of the keys of every member with an event at the
+        given time. Any fraction of a second is ignored.
+        '''
+        day_of_week = get_day_of_week(dt.toordinal())
+
+        slots = (self._second_index[dt.second] & self._minute_index[dt.minute]
+                 & self._hour_index[dt.hour] & self._day_of_week_index[day_of_week])
+
+        day_rule_slots = slots & self._day_rule_slots
+        if day_rule_slots:
+            year = dt.year
+            day_of_year = dt.toordinal() - datetime.date(year, 1, 1).toordinal()
+            for slot in iter_bits(day_rule_slots):
+                if not self._slots[slot][1].days_in_year(year) >> day_of_year & 1:
+                    slots ^= 1 << slot
+
+        keys = []
+        seen = set()
+        for slot in iter_bits(slots):
+            key = self._slots[slot][0]
+            # a member with several matching groups is only reported once
+            if key not in seen:
+                seen.add(key)
+                keys.append(key)
+        return keys
+
+    def _index(self, key, schedule):
+        slots = []
+        for compiled in schedule._groups:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._slots[slot] = (key, compiled)
+            else:
+                slot = len(self._slots)
+                self._slots.append((key, compiled))
+            slots.append(slot)
+            self._update_index(slot, compiled)
+        self._key_slots[key] = slots
+
+    def _unindex(self, slot):
+        self._update_index(slot, self._slots[slot][1])
+        self._slots[slot] = None
+        self._free_slots.append(slot)
+
+    def _update_index(self, slot, compiled):
+        # toggles the bit of the slot, for adding and removing alike
+        bit = 1 << slot
+        for index, mask in ((self._second_index, compiled.seconds_mask),
+                            (self._minute_index, compiled.minutes_mask),
+                            (self._hour_index, compiled.hours_mask),
+                            (self._day_of_week_index, compiled.days_of_week_mask)):
+            for value in iter_bits(mask):
+                index[value] ^= bit
+
+        if compiled.has_day_rules:
+            self._day_rule_slots ^= bit
+
+    def _push(self, key, schedule, after):
+        try:
+            time = schedule.next(after)
+        except ValidTimeNotFoundException:
+            return
+
+        entry = [time, next(self._counter), key]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
@@ -0,0 +1,227 @@
+'''
+Compact binary form of compiled schedules, for loading many schedules
+without tokenizing and parsing their text again.
+
+Each group is stored as its parsed ranges along with its compiled masks,
+so loading only rebuilds the tuples, without compiling anything. The
+format is versioned, and blobs written by another version are rejected
+rather than misread.
+'''
+import struct
+
+from schyntax.schedule import Schedule
+from schyntax.internals.compiler import CompiledGroup, normalize_schedule_text
+from schyntax.internals.period import detect_period
+from schyntax.internals.parser import Group, Range, DateValue
+
+
+__all__ = ['dumps', 'loads', 'dumps_many', 'loads_many']
+
+
+_MAGIC = b'SCHB'
+_VERSION = 1
+
+_SINGLE = 0
+_MANY = 1
+
+# magic, version, and whether the blob holds one schedule or many
+_HEADER = struct.Struct('<4sBB')
+
+_COUNT = struct.Struct('<I')
+
+# search_days, and the length of the UTF-8 encoded text which follows
+_SCHEDULE = struct.Struct('<II')
+
+# seconds, minutes, hours and days of week masks, whether day-of-month
+# masks follow, and the number of ranges in each of the group's fields
+_GROUP = struct.Struct('<QQIB?12H')
+
+# day-of-month masks for each combination of month lengths
+_DOM_MASKS = struct.Struct('<16I')
+
+# start, end, is_half_open, interval
+_INTEGER_RANGE = struct.Struct('<hh?q')
+
+# start year (0 if none), month and day, the same for the end, is_half_open
+# and interval
+_DATE_RANGE = struct.Struct('<HBBHBB?q')
+
+# fields holding date ranges, the others hold integer ranges
+_DATE_FIELDS = frozenset(['dates', 'dates_excluded'])
+
+# what reading past the end of a blob, or garbage in it, raises
+_DECODE_ERRORS = (struct.error, IndexError, UnicodeDecodeError)
+
+
+def _dump_groups(groups, parts):
+    parts.append(_COUNT.pack(len(groups)))
+    for compiled in groups:
+        group = compiled.group
+        parts.append(_GROUP.pack(compiled.seconds_mask, compiled.minutes_mask, compiled.hours_mask,
+                                 compiled.days_of_week_mask, compiled._dom_masks is not None,
+                                 *[len(getattr(group, field)) for field in Group._fields]))
+        if compiled._dom_masks is not None:
+            parts.append(_DOM_MASKS.pack(*compiled._dom_masks))
+
+        for field in Group._fields:
+            for rng in getattr(group, field):
+                if field in _DATE_FIELDS:
+                    parts.append(_DATE_RANGE.pack(rng.start.year or 0, rng.start.month, rng.start.day,
+                                                  rng.end.year or 0, rng.end.month, rng.end.day,
+                                                  rng.is_half_open, rng.interval))
+                else:
+                    parts.append(_INTEGER_RANGE.pack(rng.start, rng.end, rng.is_half_open, rng.interval))
+
+
+def _load_groups(data, offset):
+    count, = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+
+    groups = []
+    for i in range(count):
+        values = _GROUP.unpack_from(data, offset)
+        offset += _GROUP.size
+
+        dom_masks = None
+        if values[4]:
+            dom_masks = _DOM_MASKS.unpack_from(data, offset)
+            offset += _DOM_MASKS.size
+
+        fields = []
+        for field, length in zip(Group._fields, values[5:]):
+            ranges = []
+            for j in range(length):
+                if field in _DATE_FIELDS:
+                    start_year, start_month, start_day, end_year, end_month, end_day, is_half_open, interval = \
+                        _DATE_RANGE.unpack_from(data, offset)
+                    offset += _DATE_RANGE.size
+                    ranges.append(Range(DateValue(start_year or None, start_month, start_day),
+                                        DateValue(end_year or None, end_month, end_day), is_half_open, interval))
+                else:
+                    ranges.append(Range(*_INTEGER_RANGE.unpack_from(data, offset)))
+                    offset += _INTEGER_RANGE.size
+            fields.append(tuple(ranges))
+
+        groups.append(CompiledGroup(Group(*fields), values[:4] + (dom_masks,)))
+    return groups, offset
+
+
+def _dump_schedule(schedule, parts):
+    text = schedule.original_text.encode('utf-8')
+    parts.append(_SCHEDULE.pack(schedule.search_days, len(text)))
+    parts.append(text)
+
+
+def _load_schedule(data, offset):
+    search_days, length = _SCHEDULE.unpack_from(data, offset)
+    offset += _SCHEDULE.size
+
+    # the groups are already compiled, so the constructor is skipped and
+    # the caller sets them
+    text = bytes(data[offset:offset + length])
+    if len(text) != length:
+        raise IndexError("text runs past the end of the data")
+
+    schedule = Schedule.__new__(Schedule)
+    schedule.original_text = text.decode('utf-8')
+    schedule.search_days = search_days
+    return schedule, offset + length
+
+
+def _check_header(data, kind):
+    if len(data) < _HEADER.size:
+        raise ValueError("not a serialized schyntax schedule")
+
+    magic, version, found_kind = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError("not a serialized schyntax schedule")
+    if version != _VERSION:
+        raise ValueError("unsupported serialization version %d" % version)
+    if found_kind != kind:
+        raise ValueError("use %s() for this data" % ('loads_many' if found_kind == _MANY else 'loads'))
+    return _HEADER.size
+
+
+def _check_end(data, offset):
+    if offset != len(data):
+        raise ValueError("unexpected data after the serialized schedules")
+
+
+def dumps(schedule):
+    '''
+    Returns the bytes of a single Schedule, for loads().
+    '''
+    parts = [_HEADER.pack(_MAGIC, _VERSION, _SINGLE)]
+    _dump_schedule(schedule, parts)
+    _dump_groups(schedule._groups, parts)
+    return b''.join(parts)
+
+
+def loads(data):
+    '''
+    Returns the Schedule stored by dumps().
+    '''
+    offset = _check_header(data, _SINGLE)
+    try:
+        schedule, offset = _load_schedule(data, offset)
+        schedule._groups, offset = _load_groups(data, offset)
+    except _DECODE_ERRORS:
+        raise ValueError("truncated or corrupt serialized schedule")
+    _check_end(data, offset)
+
+    schedule._period = detect_period(schedule._groups)
+    return schedule
+
+
+def dumps_many(schedules):
+    '''
+    Returns the bytes of a sequence of Schedule instances, for loads_many().
+    The groups of schedules with the same text (ignoring whitespace) are
+    only stored once.
+    '''
+    schedules = list(schedules)
+
+    tables = {}
+    table_parts = []
+    schedule_parts = []
+    for schedule in schedules:
+        key = normalize_schedule_text(schedule.original_text)
+        if key not in tables:
+            tables[key] = len(tables)
+            _dump_groups(schedule._groups, table_parts)
+
+        _dump_schedule(schedule, schedule_parts)
+        schedule_parts.append(_COUNT.pack(tables[key]))
+
+    return b''.join([_HEADER.pack(_MAGIC, _VERSION, _MANY), _COUNT.pack(len(tables))] + table_parts
+                    + [_COUNT.pack(len(schedules))] + schedule_parts)
+
+
+def loads_many(data):
+    '''
+    Returns the list of Schedule instances stored by dumps_many(). Schedules
+    with the same text share their compiled groups, as they would through
+    the parse cache.
+    '''
+    offset = _check_header(data, _MANY)
+    try:
+        count, = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        tables = []
+        for i in range(count):
+            groups, offset = _load_groups(data, offset)
+            tables.append((groups, detect_period(groups)))
+
+        count, = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        schedules = []
+        for i in range(count):
+            schedule, offset = _load_schedule(data, offset)
+            schedule._groups, schedule._period = tables[_COUNT.unpack_from(data, offset)[0]]
+            offset += _COUNT.size
+            schedules.append(schedule)
+    except _DECODE_ERRORS:
+        raise ValueError("truncated or corrupt serialized schedules")
+    _check_end(data, offset)
+
+    return schedules
@@ -0,0 +1,18 @@
+import sys
+
+
+# test modules for the parts of the package which need a newer Python
+collect_ignore = []
+
+# async def, and asyncio.run()
+if sys.version_info < (3, 7):
+    collect_ignore.append('test_aio.py')
+
+# os.replace() and memoryview.cast()
+if sys.version_info < (3, 3):
+    collect_ignore.extend(['test_checkpoint.py', 'test_firetable.py'])
+
+try:
+    import concurrent.futures
+except ImportError:
+    collect_ignore.append('test_executor.py')
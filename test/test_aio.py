@@ -0,0 +1,103 @@
+import asyncio
+import datetime
+import time
+
+from schyntax import Schedule
+from schyntax.aio import AsyncScheduler, SKIP, QUEUE, CONCURRENT
+
+
+def _clock(start):
+    # wall clock which starts at the given time and runs at real speed
+    started = time.monotonic()
+    return lambda: start + datetime.timedelta(seconds=time.monotonic() - started)
+
+
+def test_overlap_policies():
+    # first event after 0.1s, the next one a second later
+    now = _clock(datetime.datetime(2015, 1, 1, 0, 0, 0, 900000))
+    runs = {SKIP: [], QUEUE: [], CONCURRENT: []}
+
+    async def main():
+        release = asyncio.Event()
+        scheduler = AsyncScheduler(now)
+
+        for overlap in runs:
+            async def job(time, overlap=overlap):
+                runs[overlap].append(time)
+                await release.wait()
+            scheduler.add(overlap, Schedule("seconds(*)"), job, overlap)
+
+        runner = asyncio.ensure_future(scheduler.run())
+        await asyncio.sleep(1.3)
+        scheduler.stop()
+        await runner
+
+        started = {overlap: list(times) for overlap, times in runs.items()}
+
+        # the queued run starts once the first one finishes
+        release.set()
+        await asyncio.sleep(0.05)
+        return started
+
+    started = asyncio.run(main())
+
+    first = datetime.datetime(2015, 1, 1, 0, 0, 1)
+    second = datetime.datetime(2015, 1, 1, 0, 0, 2)
+    assert started == {SKIP: [first], QUEUE: [first], CONCURRENT: [first, second]}
+    assert runs == {SKIP: [first], QUEUE: [first, second], CONCURRENT: [first, second]}
+
+
+def test_add_and_remove_while_running():
+    now = _clock(datetime.datetime(2015, 1, 1, 0, 0, 0, 900000))
+    runs = []
+
+    async def job(time):
+        runs.append(time)
+
+    async def main():
+        scheduler = AsyncScheduler(now)
+        runner = asyncio.ensure_future(scheduler.run())
+        await asyncio.sleep(0)
+
+        # the sleeping timer is recomputed for the new job
+        scheduler.add('a', Schedule("seconds(*)"), job)
+        scheduler.add('b', Schedule("seconds(*)"), job)
+        scheduler.remove('b')
+        assert len(scheduler) == 1 and 'b' not in scheduler
+
+        await asyncio.sleep(0.3)
+        scheduler.stop()
+        await runner
+
+    asyncio.run(main())
+    assert runs == [datetime.datetime(2015, 1, 1, 0, 0, 1)]
+
+
+def test_failing_jobs_dont_stop_the_others():
+    now = _clock(datetime.datetime(2015, 1, 1, 0, 0, 0, 900000))
+    runs = []
+    errors = []
+
+    async def job(time):
+        runs.append(time)
+
+    def raises(time):
+        raise RuntimeError()
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context['exception']))
+
+        scheduler = AsyncScheduler(now)
+        scheduler.add('job', Schedule("seconds(*)"), job)
+        scheduler.add('raises', Schedule("seconds(*)"), raises)
+        # not a coroutine function, ensure_future() rejects its result
+        scheduler.add('plain', Schedule("seconds(*)"), lambda time: None)
+
+        runner = asyncio.ensure_future(scheduler.run())
+        await asyncio.sleep(1.3)
+        scheduler.stop()
+        await runner
+
+    asyncio.run(main())
+    assert runs == [datetime.datetime(2015, 1, 1, 0, 0, 1), datetime.datetime(2015, 1, 1, 0, 0, 2)]
+    assert len(errors) == 4
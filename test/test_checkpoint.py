@@ -0,0 +1,100 @@
+import datetime
+
+import pytest
+
+from schyntax import Schedule
+from schyntax.checkpoint import Checkpoint, catch_up
+
+
+def test_records_survive_reopening(tmp_path):
+    path = str(tmp_path / 'checkpoint')
+    first = datetime.datetime(2015, 1, 1, 12, 30, 15, 500)
+    second = datetime.datetime(2015, 1, 2)
+
+    with Checkpoint(path, batch_size=2) as checkpoint:
+        checkpoint.record('a', first)
+        checkpoint.record('b', first)     # flushes
+        checkpoint.record('a', second)    # flushed by close()
+
+    with Checkpoint(path) as checkpoint:
+        assert checkpoint.last_fired() == {'a': second, 'b': first.replace(microsecond=0)}
+
+
+def test_torn_batch_is_discarded(tmp_path):
+    path = str(tmp_path / 'checkpoint')
+    with Checkpoint(path) as checkpoint:
+        checkpoint.record('a', datetime.datetime(2015, 1, 1))
+        checkpoint.flush()
+        checkpoint.record(u'été', datetime.datetime(2015, 1, 2))
+
+    # a crash in the middle of writing the last batch
+    with open(path, 'r+b') as f:
+        f.truncate(len(f.read()) - 3)
+
+    with Checkpoint(path) as checkpoint:
+        assert checkpoint.last_fired() == {'a': datetime.datetime(2015, 1, 1)}
+        checkpoint.record('b', datetime.datetime(2015, 1, 3))
+
+    # new batches are appended after the last intact one
+    with Checkpoint(path) as checkpoint:
+        assert sorted(checkpoint.last_fired()) == ['a', 'b']
+
+
+def test_compact(tmp_path):
+    path = str(tmp_path / 'checkpoint')
+    with Checkpoint(path, batch_size=1) as checkpoint:
+        for day in range(1, 31):
+            checkpoint.record('a', datetime.datetime(2015, 1, day))
+        size = tmp_path.joinpath('checkpoint').stat().st_size
+
+        checkpoint.compact()
+        assert tmp_path.joinpath('checkpoint').stat().st_size < size / 10
+
+        checkpoint.record('b', datetime.datetime(2015, 2, 1))
+
+    with Checkpoint(path) as checkpoint:
+        assert checkpoint.last_fired() == {'a': datetime.datetime(2015, 1, 30), 'b': datetime.datetime(2015, 2, 1)}
+
+
+def test_long_key_is_rejected(tmp_path):
+    path = str(tmp_path / 'checkpoint')
+    with Checkpoint(path) as checkpoint:
+        checkpoint.record('a', datetime.datetime(2015, 1, 1))
+        with pytest.raises(ValueError):
+            checkpoint.record('x' * 70000, datetime.datetime(2015, 1, 1))
+        checkpoint.record('b', datetime.datetime(2015, 1, 2))
+
+    with Checkpoint(path) as checkpoint:
+        assert sorted(checkpoint.last_fired()) == ['a', 'b']
+
+
+def test_not_a_checkpoint(tmp_path):
+    path = tmp_path / 'checkpoint'
+    path.write_bytes(b'something else')
+    with pytest.raises(ValueError):
+        Checkpoint(str(path))
+
+
+def test_catch_up():
+    schedules = {
+        'a': Schedule("hours(*%6), minutes(0)"),
+        'b': Schedule("hours(*%6),  minutes(0)"),
+        'c': Schedule("days(sat)"),
+        'd': Schedule("minutes(0)"),
+    }
+    last_fired = {
+        'a': datetime.datetime(2015, 1, 1, 6),
+        'b': datetime.datetime(2015, 1, 1, 12),
+        'c': datetime.datetime(2015, 1, 1),
+    }
+    now = datetime.datetime(2015, 1, 1, 18, 0, 0, 500)
+
+    missed = catch_up(schedules, last_fired, now)
+    assert sorted(missed) == ['a', 'b']
+
+    epoch = datetime.datetime(1970, 1, 1)
+    assert [epoch + datetime.timedelta(seconds=t) for t in missed['a']] == [
+        datetime.datetime(2015, 1, 1, 12),
+        datetime.datetime(2015, 1, 1, 18),
+    ]
+    assert [epoch + datetime.timedelta(seconds=t) for t in missed['b']] == [datetime.datetime(2015, 1, 1, 18)]
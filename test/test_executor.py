@@ -0,0 +1,85 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from schyntax import Schedule
+from schyntax.executor import ExecutorScheduler
+
+
+def _wait_for_next_second():
+    # leaves enough of the second for the jobs to be added before it ends
+    time.sleep(1.05 - time.time() % 1)
+
+
+def test_thread_pool():
+    runs = []
+
+    def job(scheduled):
+        runs.append(scheduled)
+
+    def failing_job(scheduled):
+        raise RuntimeError()
+
+    scheduler = ExecutorScheduler()
+    _wait_for_next_second()
+    scheduler.add('job', Schedule("seconds(*)"), job)
+    scheduler.add('failing', Schedule("seconds(*)"), failing_job)
+    scheduler.add('never', Schedule("dates(2010/1/1)"), job)
+    scheduler.start()
+
+    time.sleep(1.2)
+    scheduler.stop()
+
+    assert len(runs) == 1
+    assert len(scheduler) == 3 and 'job' in scheduler
+
+    stats = scheduler.stats('job')
+    assert stats.runs == 1 and stats.errors == 0
+    assert 0 <= stats.last_latency == stats.mean_latency == stats.max_latency < 1
+
+    assert scheduler.stats('failing')[:2] == (0, 1)
+    assert scheduler.stats('never') == (0, 0, None, None, None)
+
+
+def test_process_pool():
+    with ProcessPoolExecutor(1) as executor:
+        scheduler = ExecutorScheduler(executor)
+        _wait_for_next_second()
+        # any picklable callable taking the scheduled time works
+        scheduler.add('job', Schedule("seconds(*)"), str)
+        scheduler.start()
+
+        time.sleep(1.2)
+        scheduler.stop()
+
+        # the pool outlives the scheduler unless the scheduler created it
+        assert executor.submit(str, 1).result() == '1'
+        assert scheduler.stats('job').runs == 1
+
+        scheduler.remove('job')
+        assert 'job' not in scheduler
+
+
+def test_restart_and_submit_errors():
+    scheduler = ExecutorScheduler()
+    scheduler.start()
+    scheduler.stop()
+
+    # the pool which was shut down is replaced
+    _wait_for_next_second()
+    scheduler.add('job', Schedule("seconds(*)"), str)
+    scheduler.start()
+    time.sleep(1.2)
+    scheduler.stop()
+    assert scheduler.stats('job').runs == 1
+
+    # a pool which rejects jobs only counts as errors
+    executor = ProcessPoolExecutor(1)
+    executor.shutdown()
+    scheduler = ExecutorScheduler(executor)
+    _wait_for_next_second()
+    scheduler.add('job', Schedule("seconds(*)"), str)
+    scheduler.start()
+    time.sleep(1.2)
+    assert scheduler._thread.is_alive()
+    scheduler.stop()
+    assert scheduler.stats('job')[:2] == (0, 1)
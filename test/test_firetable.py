@@ -0,0 +1,59 @@
+import datetime
+
+import pytest
+
+from schyntax import Schedule, ValidTimeNotFoundException
+from schyntax.firetable import build_fire_table, FireTable
+
+
+START = datetime.datetime(2015, 1, 1)
+END = datetime.datetime(2015, 1, 8)
+
+
+@pytest.fixture
+def table(tmp_path):
+    path = str(tmp_path / 'table')
+    schedules = {
+        'every15': Schedule("minutes(*%15), seconds(0)"),
+        'weekdays': Schedule("days(mon..fri), hours(9)"),
+        'never': Schedule("dates(2010/1/1)"),
+    }
+    build_fire_table(path, schedules, START, END)
+
+    with FireTable(path) as table:
+        yield schedules, table
+
+
+def test_matches_schedule(table):
+    schedules, table = table
+    assert sorted(table) == ['every15', 'never', 'weekdays']
+
+    for key in ('every15', 'weekdays'):
+        schedule = schedules[key]
+        assert list(table.events(key)) == list(schedule.between(START, END))
+
+        ref = START + datetime.timedelta(days=1, seconds=1)
+        while ref < datetime.datetime(2015, 1, 6):
+            assert table.next(key, ref) == schedule.next(ref)
+            assert table.previous(key, ref) == schedule.previous(ref)
+            ref += datetime.timedelta(hours=3, minutes=7, seconds=31)
+
+
+def test_outside_of_window(table):
+    schedules, table = table
+    epoch = datetime.datetime(1970, 1, 1)
+
+    assert table.next('every15', START - datetime.timedelta(seconds=1)) == START
+    with pytest.raises(ValidTimeNotFoundException):
+        table.next('every15', START - datetime.timedelta(seconds=2))
+    with pytest.raises(ValidTimeNotFoundException):
+        table.next('every15', datetime.datetime(2015, 1, 7, 23, 45))
+
+    assert table.previous_epoch('every15', table.end - 1) == (datetime.datetime(2015, 1, 7, 23, 45) - epoch).total_seconds()
+    with pytest.raises(ValidTimeNotFoundException):
+        table.previous('every15', END)
+    with pytest.raises(ValidTimeNotFoundException):
+        table.previous('weekdays', START)
+
+    with pytest.raises(ValidTimeNotFoundException):
+        table.next('never', START)
@@ -8,10 +8,13 @@
 import os
 import json
 import datetime
+import itertools
 
 import pytest
 
-from schyntax import Schedule, SchyntaxParseException, InvalidScheduleException
+import schyntax
+from schyntax import Schedule, SchyntaxParseException, InvalidScheduleException, ValidTimeNotFoundException
+from schyntax.internals.dateutil import get_epoch_seconds
 
 
 def _gather_cases():
@@ -44,17 +47,304 @@ def test_json_data(fmt, date, prev, next):
     assert prev == schedule.previous(date)
 
 
+@pytest.mark.parametrize('fmt,date,prev,next', _gather_cases())
+def test_json_data_iterators(fmt, date, prev, next):
+    schedule = Schedule(fmt)
+    assert next == list(itertools.islice(schedule.iter_next(date), 1))[0]
+    assert prev == list(itertools.islice(schedule.iter_previous(date), 1))[0]
+
+
+@pytest.mark.parametrize('fmt,date,prev,next', _gather_cases())
+def test_json_data_epoch(fmt, date, prev, next):
+    schedule = Schedule(fmt)
+    assert get_epoch_seconds(next) == schedule.next_epoch(get_epoch_seconds(date))
+    assert get_epoch_seconds(prev) == schedule.previous_epoch(get_epoch_seconds(date))
+
+
+@pytest.mark.parametrize('fmt,date,prev,next', _gather_cases())
+def test_json_data_matches(fmt, date, prev, next):
+    schedule = Schedule(fmt)
+    assert schedule.matches(prev)
+    assert schedule.matches(next)
+    assert schedule.matches(date) == (date.replace(microsecond=0) == prev)
+    
+    # nothing matches strictly in between
+    for dt in (prev + datetime.timedelta(seconds=1), next - datetime.timedelta(seconds=1)):
+        if prev < dt < next:
+            assert not schedule.matches(dt)
+
+
+@pytest.mark.parametrize('fmt', [
+    "minutes(*%7), seconds(0, 30)",
+    "hours(23), minutes(59), seconds(59)",
+    "{days(mon), hours(9)} {days(mon..fri), hours(9, 17)}",
+    "dom(-1), hours(12)",
+    "dates(2/28..3/1), hours(*%6)",
+])
+def test_iterators_match_repeated_calls(fmt):
+    schedule = Schedule(fmt)
+    start = datetime.datetime(2015, 12, 30, 23, 59, 58)
+    
+    expected = []
+    after = start
+    for i in range(50):
+        after = schedule.next(after)
+        expected.append(after)
+    assert expected == list(itertools.islice(schedule.iter_next(start), 50))
+    
+    expected = []
+    at_or_before = start
+    for i in range(50):
+        event = schedule.previous(at_or_before)
+        expected.append(event)
+        at_or_before = event - datetime.timedelta(milliseconds=1)
+    assert expected == list(itertools.islice(schedule.iter_previous(start), 50))
+
+
+@pytest.mark.parametrize('fmt', [
+    "minutes(*%7), seconds(0, 30)",
+    "dom(-1), hours(12)",
+])
+def test_between(fmt):
+    schedule = Schedule(fmt)
+    start = datetime.datetime(2015, 12, 30, 23, 59, 58, 500)
+    end = datetime.datetime(2016, 3, 2)
+    epoch = datetime.datetime(1970, 1, 1)
+    
+    expected = []
+    for event in schedule.iter_next(start):
+        if event >= end:
+            break
+        expected.append(int((event - epoch).total_seconds()))
+    
+    result = schedule.between(start, end)
+    assert result.typecode == 'q'
+    assert list(result) == expected
+    
+    assert len(schedule.between(end, start)) == 0
+
+
+def test_between_covers_whole_window():
+    # leap days are further apart than the one year next() searches
+    schedule = Schedule("dates(2/29)")
+    
+    result = schedule.between(datetime.datetime(2015, 1, 1), datetime.datetime(2025, 1, 1))
+    epoch = datetime.datetime(1970, 1, 1)
+    assert [epoch + datetime.timedelta(seconds=t) for t in result] == [
+        datetime.datetime(2016, 2, 29),
+        datetime.datetime(2020, 2, 29),
+        datetime.datetime(2024, 2, 29),
+    ]
+
+
+@pytest.mark.parametrize('fmt', [
+    "minutes(*%7), seconds(0, 30)",
+    "dom(-1), hours(12)",
+    "{days(mon..fri), hours(9..17)} {hours(12..13), minutes(*%15)} {dates(2/29), seconds(*%10)}",
+])
+def test_count(fmt):
+    schedule = Schedule(fmt)
+    start = datetime.datetime(2015, 12, 30, 23, 59, 58, 500)
+    
+    for end in (start, datetime.datetime(2015, 12, 31, 0, 30), datetime.datetime(2016, 3, 2, 12, 0, 1, 1)):
+        assert schedule.count(start, end) == len(schedule.between(start, end))
+    
+    assert schedule.count(datetime.datetime(2016, 1, 1), datetime.datetime(2015, 1, 1)) == 0
+
+
+def test_count_long_windows():
+    schedule = Schedule("seconds(*)")
+    assert schedule.count(datetime.datetime(2000, 1, 1), datetime.datetime(2100, 1, 1)) == 36525 * 86400
+    
+    schedule = Schedule("dates(2/29), hours(6)")
+    assert schedule.count(datetime.datetime(2015, 1, 1), datetime.datetime(2025, 1, 1)) == 3
+
+
+def test_between_as_numpy():
+    numpy = pytest.importorskip("numpy")
+    schedule = Schedule("hours(12)")
+    
+    result = schedule.between(datetime.datetime(2015, 1, 1), datetime.datetime(2015, 1, 3), as_numpy=True)
+    assert result.dtype == numpy.dtype('datetime64[s]')
+    assert list(result) == [numpy.datetime64('2015-01-01T12:00:00'), numpy.datetime64('2015-01-02T12:00:00')]
+
+
+@pytest.mark.parametrize('fmt', [
+    "minutes(*%7), seconds(0, 30)",
+    "{days(mon..fri), hours(9)} {dom(-1), hours(23), minutes(59), seconds(59)}",
+    "dates(2/29), hours(0..1)",
+])
+def test_matches_many_and_next_many(fmt):
+    numpy = pytest.importorskip("numpy")
+    schedule = Schedule(fmt)
+    
+    # every 20 minutes or so across a few days, and every second around midnight
+    times = numpy.concatenate([
+        numpy.arange('2016-02-26', '2016-03-02', 1201, dtype='datetime64[s]'),
+        numpy.arange('2016-02-29T23:59:00', '2016-03-01T00:01:00', dtype='datetime64[s]'),
+    ])
+    
+    matched = schedule.matches_many(times)
+    following = schedule.next_many(times)
+    assert following.dtype == numpy.dtype('datetime64[s]')
+    
+    for time, is_match, event in zip(times.tolist(), matched, following.tolist()):
+        assert is_match == schedule.matches(time)
+        try:
+            expected = schedule.next(time)
+        except ValidTimeNotFoundException:
+            expected = None    # NaT
+        assert event == expected
+    
+    # epoch seconds in, epoch seconds out
+    seconds = times.astype(numpy.int64).reshape(2, -1)
+    assert (schedule.next_many(seconds) == following.astype(numpy.int64).reshape(2, -1)).all()
+    assert (schedule.matches_many(seconds) == matched.reshape(2, -1)).all()
+
+
+def test_next_many_not_found():
+    numpy = pytest.importorskip("numpy")
+    schedule = Schedule("date(2030/1/1)")
+    
+    times = numpy.array(['2026-03-01', '2029-06-01T12:30:00.250'], dtype='datetime64[ms]')
+    result = schedule.next_many(times)
+    assert numpy.isnat(result[0])
+    assert result[1] == numpy.datetime64('2030-01-01T00:00:00')
+    
+    assert not numpy.isnat(schedule.next_many(times, search_days=5 * 366)).any()
+    
+    # NaT in, NaT out
+    times = numpy.array(['NaT', '2029-12-31T12:00:00'], dtype='datetime64[s]')
+    assert numpy.isnat(schedule.next_many(times)).tolist() == [True, False]
+    assert schedule.matches_many(numpy.array(['NaT'], dtype='datetime64[s]')).tolist() == [False]
+    assert schedule.next_many(times.astype(numpy.int64))[0] == times.astype(numpy.int64)[0]
+
+
+@pytest.mark.parametrize('fmt,expected', [
+    # in common years the interval counts from february 28th
+    ("dates(2/29..3/6 % 2)", ["2015-03-02", "2015-03-04", "2015-03-06", "2016-02-29", "2016-03-02", "2016-03-04", "2016-03-06", "2017-03-02"]),
+    # split ranges count from the start in the previous year
+    ("dates(12/30..1/4 % 3)", ["2014-12-30", "2015-01-02", "2015-12-30", "2016-01-02", "2016-12-30", "2017-01-02", "2017-12-30", "2018-01-02"]),
+])
+def test_date_intervals(fmt, expected):
+    events = itertools.islice(Schedule(fmt + ", hours(0)").iter_next(datetime.datetime(2014, 12, 1)), len(expected))
+    assert [event.strftime("%Y-%m-%d") for event in events] == expected
+
+
+def test_date_interval_without_end():
+    # the interval runs to the end of the start's year
+    schedule = Schedule("date(2017/12/15 % 7)")
+    assert [event.day for event in schedule.iter_next(datetime.datetime(2017, 1, 1))] == [15, 22, 29]
+    assert schedule.count(datetime.datetime(2000, 1, 1), datetime.datetime(2100, 1, 1)) == 3
+    
+    with pytest.raises(ValidTimeNotFoundException):
+        schedule.next(datetime.datetime(2016, 1, 1))
+    with pytest.raises(ValidTimeNotFoundException):
+        schedule.previous(datetime.datetime(2017, 12, 14))
+    
+    assert Schedule("date(12/15 % 7)").next(datetime.datetime(2017, 12, 29)) == datetime.datetime(2018, 12, 15)
+
+
 @pytest.mark.parametrize('fmt', [
     # empty
     "",
     " ",
     "{}",
+    
+    # can never match
+    "seconds(5, !5)",
+    "hours(3), hours(!0..23)",
+    "days(!*%1)",
+    "{minutes(*), minutes(!*%1)} {dom(31), dates(2/1..2/28)}",
+    "dates(1/1), dates(!1/1)",
+    "dates(2/29), dom(-1), dom(!29)",
 ])
 def test_invalid_schedule_exception(fmt):
     with pytest.raises(InvalidScheduleException):
         Schedule(fmt)
 
 
+def test_impossible_groups_are_dropped():
+    schedule = Schedule("{seconds(5, !5)} {hours(12)} {dom(30..31), dates(2/1..2/28)}")
+    assert len(schedule._groups) == 1
+    assert schedule.next(datetime.datetime(2015, 1, 1)) == datetime.datetime(2015, 1, 1, 12)
+
+
+def test_search_days():
+    after = datetime.datetime(2026, 3, 1)
+    schedule = Schedule("date(2030/1/1)")
+    
+    with pytest.raises(ValidTimeNotFoundException):
+        schedule.next(after)
+    
+    assert schedule.next(after, search_days=5 * 366) == datetime.datetime(2030, 1, 1)
+    assert Schedule("date(2030/1/1)", search_days=5 * 366).next(after) == datetime.datetime(2030, 1, 1)
+    assert schedule.previous(datetime.datetime(2040, 1, 1), search_days=11 * 366) == datetime.datetime(2030, 1, 1)
+    
+    schedule = Schedule("hours(12)", search_days=1)
+    assert schedule.next(datetime.datetime(2026, 3, 1, 11)) == datetime.datetime(2026, 3, 1, 12)
+    with pytest.raises(ValidTimeNotFoundException):
+        schedule.next(datetime.datetime(2026, 3, 1, 12))
+    
+    schedule = Schedule("hours(0), minutes(0), seconds(0)", search_days=1)
+    assert schedule.next(datetime.datetime(2026, 3, 1, 23, 59, 59)) == datetime.datetime(2026, 3, 2)
+    assert list(itertools.islice(schedule.iter_next(datetime.datetime(2026, 3, 1)), 2)) == []
+
+
+def test_search_days_skips_years():
+    schedule = Schedule("dates(2019/12/30..2020/1/2, 2150/6/1), hours(6)")
+    
+    events = list(schedule.iter_next(datetime.datetime(2000, 1, 1), search_days=200 * 366))
+    assert events == [
+        datetime.datetime(2019, 12, 30, 6),
+        datetime.datetime(2019, 12, 31, 6),
+        datetime.datetime(2020, 1, 1, 6),
+        datetime.datetime(2020, 1, 2, 6),
+        datetime.datetime(2150, 6, 1, 6),
+    ]
+    
+    # none of the years in between had their days evaluated
+    assert len(schedule._groups[0]._years) == 3
+
+
+@pytest.mark.parametrize('fmt', [
+    "minutes(*%5)",
+    "hours(*%2), minutes(0)",
+    "days(mon..fri), hours(9)",
+    "days(mon..fri), hours(*), minutes(*)",
+    "{days(sat), hours(23), minutes(59), seconds(59)} {hours(*%6), minutes(0)}",
+])
+def test_periodic_fast_path(fmt):
+    schedule = Schedule(fmt)
+    assert schedule._period is not None
+    
+    def search(ref, is_after, search_days):
+        # the general engine, bypassing the fast path
+        for event in schedule._iter_events(ref.toordinal(), ref.hour * 3600 + ref.minute * 60 + ref.second, is_after, search_days=search_days):
+            return schedule._to_datetime(event)
+        return None
+    
+    ref = datetime.datetime(2015, 12, 26, 23, 59, 58, 500)
+    for i in range(200):
+        for is_after in (True, False):
+            for search_days in (1, None):
+                try:
+                    event = schedule._get_event(ref, is_after, search_days)
+                except ValidTimeNotFoundException:
+                    event = None
+                assert event == search(ref, is_after, search_days)
+        ref += datetime.timedelta(minutes=53, seconds=1)
+
+
+def test_periodic_fast_path_detection():
+    assert Schedule("dom(-1), hours(12)")._period is None
+    assert Schedule("{hours(12)} {dates(1/1)}")._period is None
+    assert Schedule("seconds(*)")._period is not None
+    
+    # detected once for the groups shared through the parse cache
+    assert Schedule("days(mon..fri), hours(*), minutes(*)")._period is Schedule("days(mon..fri),  hours(*), minutes(*)")._period
+
+
 @pytest.mark.parametrize('fmt', [
     # bad expression name (at least)
     "foo",
@@ -122,3 +412,44 @@ def test_parse_exception(fmt):
     with pytest.raises(SchyntaxParseException):
         Schedule(fmt)
 
+
+
+def test_parse_cache():
+    schyntax.clear_parse_cache()
+    
+    first = Schedule("hours(12), minutes(30)")
+    second = Schedule("  hours(12),\tminutes(30)\n")
+    third = Schedule("hours(12), minutes(31)")
+    
+    assert first._groups is second._groups
+    assert first._groups is not third._groups
+    
+    info = schyntax.get_parse_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+    
+    try:
+        schyntax.set_parse_cache_size(1)
+        assert schyntax.get_parse_cache_info().currsize == 1
+        
+        schyntax.set_parse_cache_size(0)
+        assert Schedule("hours(12), minutes(31)")._groups is not Schedule("hours(12), minutes(31)")._groups
+    finally:
+        schyntax.set_parse_cache_size(schyntax.internals.compiler.PARSE_CACHE_SIZE)
+
+
+@pytest.mark.parametrize('size', [-1, 1.5, "10", None])
+def test_parse_cache_bad_size(size):
+    with pytest.raises(ValueError):
+        schyntax.set_parse_cache_size(size)
+    
+    # the cache still works
+    assert schyntax.get_parse_cache_info().maxsize == schyntax.internals.compiler.PARSE_CACHE_SIZE
+    Schedule("hours(2)")
+
+
+def test_parse_cache_keeps_error_positions():
+    Schedule("minutes(5)")
+    
+    with pytest.raises(SchyntaxParseException) as info:
+        Schedule("   minutes(5) foo")
+    assert info.value.index == 14
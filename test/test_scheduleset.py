@@ -0,0 +1,105 @@
+import datetime
+
+from schyntax import Schedule, ScheduleSet
+
+
+START = datetime.datetime(2015, 6, 1, 12, 0, 0)
+
+
+def _make_set():
+    schedules = ScheduleSet()
+    schedules.add("five", Schedule("minutes(*%5)"), START)
+    schedules.add("hourly", Schedule("minutes(0)"), START)
+    schedules.add("never", Schedule("dates(2010/1/1)"), START)
+    return schedules
+
+
+def test_peek():
+    schedules = _make_set()
+    assert len(schedules) == 3
+    assert "never" in schedules
+    assert schedules.peek() == (datetime.datetime(2015, 6, 1, 12, 5), "five")
+
+
+def test_pop_due():
+    schedules = _make_set()
+    
+    assert schedules.pop_due(datetime.datetime(2015, 6, 1, 12, 4, 59)) == []
+    
+    due = schedules.pop_due(datetime.datetime(2015, 6, 1, 13, 0))
+    assert due == [(START + datetime.timedelta(minutes=m), "five") for m in range(5, 60, 5)] + [
+        (datetime.datetime(2015, 6, 1, 13, 0), "hourly"),
+        (datetime.datetime(2015, 6, 1, 13, 0), "five"),
+    ]
+    
+    assert schedules.peek() == (datetime.datetime(2015, 6, 1, 13, 5), "five")
+
+
+def test_pop_latest_due():
+    schedules = _make_set()
+    
+    assert schedules.pop_latest_due(datetime.datetime(2015, 6, 1, 12, 4, 59)) == []
+    
+    due = schedules.pop_latest_due(datetime.datetime(2015, 6, 1, 14, 2, 30, 500))
+    assert due == [
+        (datetime.datetime(2015, 6, 1, 14, 0), "five"),
+        (datetime.datetime(2015, 6, 1, 14, 0), "hourly"),
+    ]
+    
+    assert schedules.peek() == (datetime.datetime(2015, 6, 1, 14, 5), "five")
+
+
+def test_pop_due_matches_merged_next():
+    schedules = ScheduleSet()
+    formats = ["minutes(*%7)", "hours(*%2), minutes(13)", "seconds(*%45)", "days(mon), hours(9)"]
+    for fmt in formats:
+        schedules.add(fmt, Schedule(fmt), START)
+    
+    end = START + datetime.timedelta(days=8)
+    expected = []
+    for fmt in formats:
+        for event in Schedule(fmt).iter_next(START):
+            if event > end:
+                break
+            expected.append((event, fmt))
+    
+    assert sorted(schedules.pop_due(end)) == sorted(expected)
+
+
+def test_remove_and_replace():
+    schedules = _make_set()
+    
+    schedules.remove("five")
+    schedules.remove("missing")
+    assert "five" not in schedules
+    assert schedules.peek() == (datetime.datetime(2015, 6, 1, 13, 0), "hourly")
+    
+    schedules.add("hourly", Schedule("minutes(30)"), START)
+    assert len(schedules) == 2
+    assert schedules.peek() == (datetime.datetime(2015, 6, 1, 12, 30), "hourly")
+    
+    schedules.remove("hourly")
+    assert schedules.peek() is None
+    assert schedules.pop_due(START + datetime.timedelta(days=365)) == []
+
+
+def test_due_at():
+    schedules = ScheduleSet()
+    formats = [
+        "minutes(*%7)",
+        "hours(*%2), minutes(13)",
+        "seconds(*%45)",
+        "days(mon), hours(9)",
+        "dom(-1), hours(0..12)",
+        "{dates(6/1..6/3), hours(0)} {days(tue), minutes(14)}",
+        "hours(!*%2)",
+    ]
+    for fmt in formats:
+        schedules.add(fmt, Schedule(fmt), START)
+    schedules.remove("hours(!*%2)")
+    
+    day = datetime.datetime(2015, 5, 31)
+    for minutes in range(0, 4 * 24 * 60, 7):
+        dt = day + datetime.timedelta(minutes=minutes, seconds=45 * (minutes % 2))
+        expected = [fmt for fmt in formats[:-1] if schedules.get(fmt).previous(dt) == dt]
+        assert sorted(schedules.due_at(dt)) == sorted(expected)
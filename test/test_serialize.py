@@ -0,0 +1,89 @@
+import datetime
+import json
+
+import pytest
+
+from schyntax import Schedule
+from schyntax.serialize import dumps, loads, dumps_many, loads_many
+
+
+def _formats():
+    with open("test/tests.json") as f:
+        stuff = json.loads(f.read())
+    return sorted(set(check["format"] for group in stuff.values() for check in group["checks"]))
+
+
+def _assert_same(loaded, schedule):
+    assert loaded.original_text == schedule.original_text
+    assert loaded.search_days == schedule.search_days
+    assert [compiled.group for compiled in loaded._groups] == [compiled.group for compiled in schedule._groups]
+    for restored, compiled in zip(loaded._groups, schedule._groups):
+        assert (restored.seconds_mask, restored.minutes_mask, restored.hours_mask, restored.days_of_week_mask, restored._dom_masks) == \
+            (compiled.seconds_mask, compiled.minutes_mask, compiled.hours_mask, compiled.days_of_week_mask, compiled._dom_masks)
+
+    after = datetime.datetime(2015, 12, 30, 23, 59, 58)
+    assert loaded.next(after) == schedule.next(after)
+    assert loaded.previous(after) == schedule.previous(after)
+
+
+@pytest.mark.parametrize('fmt', _formats())
+def test_round_trip(fmt):
+    schedule = Schedule(fmt)
+    _assert_same(loads(dumps(schedule)), schedule)
+
+
+def test_round_trip_many():
+    schedules = [Schedule(fmt, search_days=400 + i) for i, fmt in enumerate(_formats())]
+    schedules.append(Schedule("dates(2019/12/30..2020/1/2, 12/24..<1/1 % 2), dom(-5..-1)"))
+    schedules.append(Schedule(schedules[0].original_text + "  "))
+
+    loaded = loads_many(dumps_many(schedules))
+    assert len(loaded) == len(schedules)
+    for restored, schedule in zip(loaded, schedules):
+        _assert_same(restored, schedule)
+
+    # same text, same groups
+    assert loaded[0]._groups is loaded[-1]._groups
+
+
+def test_identical_schedules_are_stored_once():
+    text = "hours(12), minutes(30)"
+    one = len(dumps_many([Schedule(text)]))
+    many = len(dumps_many([Schedule(text)] * 1001))
+
+    # only the text and settings of each schedule are repeated
+    assert many - one == 1000 * (len(dumps_many([Schedule(text)] * 2)) - one)
+    assert len(dumps_many([Schedule(text)] * 2)) - one < len(text) + 16
+
+
+def test_bad_data():
+    data = dumps(Schedule("hours(12)"))
+
+    with pytest.raises(ValueError):
+        loads(b"nonsense")
+    with pytest.raises(ValueError):
+        loads(data[:4] + b"\x63" + data[5:])
+    with pytest.raises(ValueError):
+        loads_many(data)
+    with pytest.raises(ValueError):
+        loads(dumps_many([]))
+
+
+def test_truncated_or_corrupt_data():
+    schedule = Schedule("dates(12/24..<1/1 % 2), dom(-5..-1), hours(12)")
+    data = dumps(schedule)
+    data_many = dumps_many([schedule, Schedule("minutes(0)")])
+
+    for length in range(len(data)):
+        with pytest.raises(ValueError):
+            loads(data[:length])
+    for length in range(len(data_many)):
+        with pytest.raises(ValueError):
+            loads_many(data_many[:length])
+
+    with pytest.raises(ValueError):
+        loads(data + b"\0")
+
+    # a schedule referring to a group table which isn't there
+    with pytest.raises(ValueError):
+        loads_many(data_many[:-4] + b"\xff\xff\xff\xff")